@@ -1,102 +1,330 @@
 """Flask application factory."""
+import functools
+import hashlib
+import importlib
 import logging
-from flask import Flask, send_from_directory, jsonify, render_template
+import mimetypes
+import os
+import tempfile
+from pathlib import Path
+import click
+import orjson
+from flask import Flask, Request, Response, abort, current_app, g, request, session, send_from_directory, jsonify, render_template, url_for
+from flask.json.provider import DefaultJSONProvider
+from flask_caching import Cache
+from jinja2 import FileSystemBytecodeCache
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_login import LoginManager
-from flask_mail import Mail
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from flask_login import LoginManager, current_user
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from config import config
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
+# Configure logging unless the server (e.g. Gunicorn) already installed a root handler
+if not logging.getLogger().handlers:
+    logging.basicConfig(
+        level=os.environ.get('LOG_LEVEL', 'INFO').upper(),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
 logger = logging.getLogger(__name__)
 
-# Initialize extensions
-db = SQLAlchemy()
-migrate = Migrate()
+# Engines by database URL and options, shared by every app created in this process
+_engine_cache = {}
+
+
+class CachedEngineSQLAlchemy(SQLAlchemy):
+    """SQLAlchemy extension that reuses one engine (and its pool) per database.
+
+    Each Gunicorn worker builds its own app after forking, so the cache is
+    never shared between processes.
+    """
+
+    def _make_engine(self, bind_key, options, app):
+        url = make_url(options['url']).render_as_string(hide_password=False)
+        key = (url, repr(sorted((k, v) for k, v in options.items() if k != 'url')))
+        if key not in _engine_cache:
+            engine = super()._make_engine(bind_key, options, app)
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', _set_sqlite_pragmas)
+            _engine_cache[key] = engine
+        return _engine_cache[key]
+
+
+# WAL lets readers run alongside the writer, and with synchronous=NORMAL a
+# commit appends to the WAL without an fsync (the WAL is synced at checkpoints)
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',
+    'PRAGMA synchronous=NORMAL',
+    'PRAGMA busy_timeout=10000',
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA mmap_size=268435456',
+    'PRAGMA cache_size=-20000',
+)
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Configure every new SQLite connection of the pool."""
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+# Initialize extensions (mail and migrate are created lazily, see __getattr__)
+db = CachedEngineSQLAlchemy()
 login_manager = LoginManager()
-mail = Mail()
 limiter = Limiter(key_func=get_remote_address, default_limits=["1000 per day", "200 per hour"])
+cache = Cache()
+
+# Uploaded files never change once written, so they may be cached for a year
+UPLOAD_MAX_AGE = 365 * 24 * 60 * 60
+
+# Subfolders of UPLOAD_FOLDER used by the admin upload forms
+UPLOAD_SUBFOLDERS = ('courses', 'art', 'pages', 'navigation')
+
+# Uploaded files are spooled here while the request is parsed; being on the
+# same filesystem as the uploads lets save_file link them into place
+UPLOAD_TMP_SUBFOLDER = '.tmp'
+
+
+# Navigation icons up to this size are kept in memory by the /uploads/ route
+SMALL_UPLOAD_MAX_SIZE = 64 * 1024
+
+
+def _load_small_uploads(upload_root, subfolder='navigation'):
+    """Read small files of an upload subfolder into memory.
+
+    Returns a dict mapping the path relative to the upload root to
+    ``(data, etag, mimetype)``.
+    """
+    cache = {}
+    folder = os.path.join(upload_root, subfolder)
+    if not os.path.isdir(folder):
+        return cache
+    for entry in os.scandir(folder):
+        if not entry.is_file() or entry.stat().st_size > SMALL_UPLOAD_MAX_SIZE:
+            continue
+        with open(entry.path, 'rb') as f:
+            data = f.read()
+        mimetype = mimetypes.guess_type(entry.name)[0] or 'application/octet-stream'
+        cache[f'{subfolder}/{entry.name}'] = (data, hashlib.sha1(data).hexdigest(), mimetype)
+    return cache
+
+
+def skip_page_cache():
+    """Bypass cached pages for admins (in-place editing UI) and pending flash messages."""
+    return current_user.is_authenticated or '_flashes' in session
+
+
+def clear_cached_page(path):
+    """Drop a single page cached by @cache.cached (stored under 'view/<path>')."""
+    cache.delete(f'view/{path}')
+
+
+@functools.lru_cache(maxsize=None)
+def _ensure_upload_dirs(upload_root):
+    """Create the upload folder and its subfolders once per process."""
+    for subfolder in UPLOAD_SUBFOLDERS + (UPLOAD_TMP_SUBFOLDER,):
+        os.makedirs(os.path.join(upload_root, subfolder), exist_ok=True)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that parses and serializes with orjson.
+
+    Datetimes and types orjson does not know are converted by Flask's default
+    function, so responses look the same as with the standard provider.
+    """
+
+    def _options(self, pretty=False):
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if pretty:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        if kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._options()).decode()
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
 
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        pretty = self.compact is False or (self.compact is None and self._app.debug)
+        data = orjson.dumps(obj, default=self.default, option=self._options(pretty))
+        return self._app.response_class(data, mimetype=self.mimetype)
 
-def create_app(config_name='development'):
-    """Create and configure the Flask application."""
+
+class UploadRequest(Request):
+    """Request that writes uploaded files straight to a temporary file on disk.
+
+    Werkzeug's default keeps uploads of up to 500 KB per file in memory.
+    """
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.NamedTemporaryFile(
+            'wb+', dir=os.path.join(current_app.upload_folder_abs, UPLOAD_TMP_SUBFOLDER))
+
+
+# Serve uploaded files (exempt from rate limiting).
+# In production Apache serves /uploads/ directly (see docker/apache),
+# so this route is only hit in development.
+@limiter.exempt
+def uploaded_file(filename):
+    # The .tmp spool folder and .part files hold uploads that are still being written
+    if any(part.startswith('.') for part in filename.split('/')):
+        abort(404)
+    cached = current_app.small_uploads.get(filename)
+    if cached is not None:
+        data, etag, mimetype = cached
+        response = Response(data, mimetype=mimetype)
+        response.set_etag(etag)
+        response.cache_control.max_age = UPLOAD_MAX_AGE
+        response = response.make_conditional(request)
+    else:
+        response = send_from_directory(current_app.upload_folder_abs, filename,
+                                       max_age=UPLOAD_MAX_AGE, conditional=True)
+    # Upload filenames are unique per upload, so the content never changes
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+def media_url(path):
+    """Public URL of an uploaded file, served from the CDN if configured."""
+    cdn_base_url = current_app.config.get('CDN_BASE_URL')
+    if cdn_base_url:
+        return f"{cdn_base_url.rstrip('/')}/uploads/{path}"
+    return url_for('uploaded_file', filename=path)
+
+
+def clear_page_cache(response):
+    """Successful admin writes may change any cached page or lookup.
+
+    Only logged-in admin requests clear the cache, so anonymous POSTs (login
+    attempts, registrations) cannot flush it; registrations drop just the
+    affected page. Views that found nothing to save set g.nothing_changed.
+    """
+    if (request.blueprint == 'admin' and request.endpoint != 'admin.login'
+            and request.method not in ('GET', 'HEAD', 'OPTIONS') and response.status_code < 400
+            and current_user.is_authenticated and not g.get('nothing_changed')):
+        cache.clear()
+    return response
+
+
+# Health check endpoint for production monitoring (exempt from rate limiting).
+# Healthy results are cached briefly so frequent probes don't all hit the DB.
+@limiter.exempt
+@cache.cached(timeout=5, response_filter=lambda rv: rv[1] == 200)
+def health_check():
+    try:
+        # Test the database with a pooled autocommit connection, outside the ORM session
+        with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+            conn.exec_driver_sql('SELECT 1')
+        return jsonify({'status': 'healthy', 'database': 'connected'}), 200
+    except Exception as e:
+        logger.error("Health check failed: %s", e)
+        return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
+
+
+# Error handlers
+def not_found_error(error):
+    return render_template('errors/404.html'), 404
+
+
+def internal_error(error):
+    db.session.rollback()
+    logger.error("Internal server error: %s", error)
+    return render_template('errors/500.html'), 500
+
+
+def create_app(config_name='development', *, register_web=True):
+    """Create and configure the Flask application.
+
+    With ``register_web=False`` the HTTP blueprints and routes are skipped,
+    which is enough for CLI tasks that only need the database and services.
+    """
     app = Flask(__name__)
+    app.request_class = UploadRequest
+    app.json = OrjsonProvider(app)
     app.config.from_object(config[config_name])
     
     # Initialize extensions
+    from app import mail
     db.init_app(app)
-    migrate.init_app(app, db)
+    # Flask-Migrate (and Alembic behind it) only serves the `flask db` commands,
+    # so it is loaded only when the flask CLI builds the app, not under Gunicorn
+    if click.get_current_context(silent=True) is not None:
+        from app import migrate
+        migrate.init_app(app, db)
     login_manager.init_app(app)
     mail.init_app(app)
     limiter.init_app(app)
+    cache.init_app(app)
     
     # Configure login manager
     login_manager.login_view = 'admin.login'
     login_manager.login_message = 'Bitte melden Sie sich an, um auf diese Seite zuzugreifen.'
     login_manager.login_message_category = 'info'
     
-    # Register blueprints
-    from app.routes import public, admin, courses, art
-    app.register_blueprint(public.bp)
-    app.register_blueprint(admin.bp)
-    app.register_blueprint(courses.bp)
-    app.register_blueprint(art.bp)
-    
     # Register CLI commands
     from app.cli import register_commands
     register_commands(app)
     
-    # Create upload directories
-    import os
-    os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-    os.makedirs(app.config['UPLOAD_FOLDER'] / 'courses', exist_ok=True)
-    os.makedirs(app.config['UPLOAD_FOLDER'] / 'art', exist_ok=True)
-    os.makedirs(app.config['UPLOAD_FOLDER'] / 'pages', exist_ok=True)
-    os.makedirs(app.config['UPLOAD_FOLDER'] / 'navigation', exist_ok=True)
-
-    # Serve uploaded files (exempt from rate limiting)
-    @app.route('/uploads/<path:filename>')
-    @limiter.exempt
-    def uploaded_file(filename):
-        import os
-        from pathlib import Path
-        upload_folder = app.config['UPLOAD_FOLDER']
-        # Ensure we use absolute path
-        if not Path(upload_folder).is_absolute():
-            upload_folder = Path(app.root_path).parent / upload_folder
-        return send_from_directory(str(upload_folder), filename)
-    
-    # Health check endpoint for production monitoring (exempt from rate limiting)
-    @app.route('/health')
-    @limiter.exempt
-    def health_check():
-        try:
-            # Test database connection
-            db.session.execute(db.text('SELECT 1'))
-            return jsonify({'status': 'healthy', 'database': 'connected'}), 200
-        except Exception as e:
-            logger.error(f"Health check failed: {e}")
-            return jsonify({'status': 'unhealthy', 'error': str(e)}), 500
-    
-    # Error handlers
-    @app.errorhandler(404)
-    def not_found_error(error):
-        return render_template('errors/404.html'), 404
+    # Resolve the absolute upload path once instead of on every request
+    upload_folder = Path(app.config['UPLOAD_FOLDER'])
+    if not upload_folder.is_absolute():
+        upload_folder = Path(app.root_path).parent / upload_folder
+    app.upload_folder_abs = str(upload_folder.resolve())
+    app.allowed_extensions = frozenset(app.config.get('ALLOWED_EXTENSIONS', ()))
     
-    @app.errorhandler(500)
-    def internal_error(error):
-        db.session.rollback()
-        logger.error(f"Internal server error: {error}")
-        return render_template('errors/500.html'), 500
+    # Create upload directories
+    _ensure_upload_dirs(app.upload_folder_abs)
+
+    if not register_web:
+        return app
+
+    # Register blueprints
+    for name in ('public', 'admin', 'courses', 'art'):
+        app.register_blueprint(importlib.import_module(f'app.routes.{name}').bp)
+
+    app.small_uploads = _load_small_uploads(app.upload_folder_abs)
+
+    # The views are module-level functions, so building many apps (tests,
+    # workers) only adds URL rules instead of defining new functions each time
+    app.add_url_rule('/uploads/<path:filename>', 'uploaded_file', uploaded_file)
+    app.add_url_rule('/health', 'health_check', health_check)
+    app.add_template_global(media_url)
+    bytecode_cache_dir = app.config.get('JINJA_BYTECODE_CACHE_DIR')
+    if bytecode_cache_dir:
+        os.makedirs(bytecode_cache_dir, exist_ok=True)
+        app.jinja_env.bytecode_cache = FileSystemBytecodeCache(bytecode_cache_dir)
+    app.after_request(clear_page_cache)
+    app.register_error_handler(404, not_found_error)
+    app.register_error_handler(500, internal_error)
     
     return app
 
 
+def __getattr__(name):
+    """Create extensions that are not needed at import time on first access."""
+    if name == 'mail':
+        from flask_mail import Mail
+        extension = Mail()
+    elif name == 'migrate':
+        from flask_migrate import Migrate
+        extension = Migrate()
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = extension
+    return extension
+
+
 # Import models after db initialization to avoid circular imports
 from app import models
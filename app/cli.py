@@ -2,13 +2,13 @@
 """CLI commands for scheduled tasks."""
 import click
 from flask.cli import with_appcontext
-from app.services.messaging import process_scheduled_messages, init_default_templates
 
 
 @click.command('send-scheduled')
 @with_appcontext
 def send_scheduled_messages():
     """Process and send all pending scheduled messages."""
+    from app.services.messaging import process_scheduled_messages
     count = process_scheduled_messages()
     click.echo(f'Processed {count} scheduled message(s)')
 
@@ -17,6 +17,7 @@ def send_scheduled_messages():
 @with_appcontext
 def init_templates():
     """Initialize default message templates."""
+    from app.services.messaging import init_default_templates
     init_default_templates()
     click.echo('Message templates initialized')
 
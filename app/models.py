@@ -1,14 +1,128 @@
 """Database models for the application."""
-from datetime import datetime
-from app import db, login_manager
+import functools
+import re
+import secrets
+import time
+from flask import current_app
+from app import db, login_manager, cache
 from flask_login import UserMixin
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import make_transient_to_detached, validates
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# Seconds a loaded admin user is reused across requests without a SELECT
+USER_CACHE_TTL = 60
+
+# user_id -> (expires_at, detached User snapshot)
+_user_cache = {}
+
+
+def normalize_phone(phone):
+    """Canonical E.164 form of a phone number; numbers without country code are Swiss.
+    
+    Raises ValueError when there are no digits to normalize.
+    """
+    # Drop formatting and the optional trunk zero in '+41 (0)79 ...'
+    cleaned = re.sub(r'\(0\)|[^\d+]', '', phone)
+    digits = cleaned.lstrip('+')
+    if not digits.isdigit():
+        raise ValueError(f'Not a phone number: {phone!r}')
+    if cleaned.startswith('+'):
+        return '+' + digits
+    if cleaned.startswith('00'):
+        return '+' + cleaned[2:]
+    if cleaned.startswith('0'):
+        return '+41' + cleaned[1:]
+    # Swiss national number typed without the leading zero (79 123 45 67)
+    if len(cleaned) == 9:
+        return '+41' + cleaned
+    return '+' + cleaned
+
+
+def _query_cache_timeout():
+    return current_app.config.get('QUERY_CACHE_TIMEOUT', 300)
+
+
+@functools.lru_cache(maxsize=None)
+def _argon2_hasher(time_cost, memory_cost, parallelism):
+    return PasswordHasher(time_cost=time_cost, memory_cost=memory_cost, parallelism=parallelism)
+
+
+def _argon2():
+    """argon2id hasher with the cost parameters from the app config."""
+    config = current_app.config
+    return _argon2_hasher(config.get('ARGON2_TIME_COST', 1),
+                          config.get('ARGON2_MEMORY_COST', 47104),
+                          config.get('ARGON2_PARALLELISM', 1))
+
+
+@functools.lru_cache(maxsize=None)
+def _dummy_password_hash(method, hasher=None):
+    """Hash of a random password, created once per method and hasher on first use."""
+    password = secrets.token_hex(16)
+    if method == 'argon2':
+        return hasher.hash(password)
+    return generate_password_hash(password, method=method)
+
 
 @login_manager.user_loader
 def load_user(user_id):
     """Load user by ID for Flask-Login."""
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    cached = _user_cache.get(user_id)
+    if cached and cached[0] > time.monotonic():
+        # Attach a copy of the snapshot to this request's session without a SELECT
+        return db.session.merge(cached[1], load=False)
+    user = db.session.get(User, user_id)
+    if user is not None:
+        snapshot = User(**{column.key: getattr(user, column.key) for column in User.__table__.columns})
+        make_transient_to_detached(snapshot)
+        _user_cache[user_id] = (time.monotonic() + USER_CACHE_TTL, snapshot)
+    return user
+
+
+def clear_user_cache(user_id=None):
+    """Forget cached users, e.g. after a user was changed or deleted."""
+    if user_id is None:
+        _user_cache.clear()
+    else:
+        _user_cache.pop(user_id, None)
+
+
+class BulkCreateMixin:
+    """Adds a multi-row INSERT helper to a model."""
+    
+    @classmethod
+    def bulk_create(cls, rows):
+        """Insert a list of column-value dicts with a single statement.
+        
+        The caller commits. All dicts must have the same keys.
+        """
+        if rows:
+            db.session.execute(insert(cls), rows)
+
+
+class ReorderMixin:
+    """Adds a drag-and-drop reorder helper to a model with an order column."""
+    
+    @classmethod
+    def reorder(cls, order_data):
+        """Set the order of rows from a list of {'id': ..., 'order': ...} dicts.
+        
+        Runs one executemany UPDATE; unknown ids are skipped. The caller commits.
+        """
+        if order_data:
+            table = cls.__table__
+            db.session.execute(
+                update(table).where(table.c.id == bindparam('row_id')).values(order=bindparam('row_order')),
+                [{'row_id': item['id'], 'row_order': item['order']} for item in order_data],
+            )
+            # Core UPDATEs skip before_flush, so flag the query cache here
+            if issubclass(cls, _QUERY_CACHED_MODELS):
+                db.session.info['query_cache_stale'] = True
 
 
 class User(UserMixin, db.Model):
@@ -19,22 +133,66 @@ class User(UserMixin, db.Model):
     email = db.Column(db.String(120), unique=True, nullable=False, index=True)
     password_hash = db.Column(db.String(255), nullable=False)
     name = db.Column(db.String(100), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
     last_login = db.Column(db.DateTime)
     
+    @validates('email')
+    def _normalize_email(self, key, value):
+        """Store emails in lower case so the unique index also serves case-insensitive logins."""
+        return value.strip().lower() if value else value
+    
     def set_password(self, password):
         """Hash and set password."""
-        self.password_hash = generate_password_hash(password)
+        method = current_app.config.get('PASSWORD_HASH_METHOD', 'argon2')
+        if method == 'argon2':
+            self.password_hash = _argon2().hash(password)
+        else:
+            self.password_hash = generate_password_hash(password, method=method)
+        clear_user_cache(self.id)
     
     def check_password(self, password):
         """Check if provided password matches hash."""
+        if self.password_hash.startswith('$argon2'):
+            try:
+                return _argon2().verify(self.password_hash, password)
+            except (VerificationError, InvalidHashError):
+                return False
+        # Werkzeug hashes (scrypt, pbkdf2) from before the switch to argon2
         return check_password_hash(self.password_hash, password)
     
+    @staticmethod
+    def check_password_without_user(password):
+        """Verify against a dummy hash when no user matches the login email.
+
+        The dummy hash uses the configured PASSWORD_HASH_METHOD, so this takes
+        as long as a failed check_password for an up-to-date account and the
+        response time does not reveal whether an email address belongs to an
+        admin. Accounts still on a legacy hash (until their next login rehashes
+        it) verify at a different speed and are not covered.
+        """
+        method = current_app.config.get('PASSWORD_HASH_METHOD', 'argon2')
+        if method == 'argon2':
+            hasher = _argon2()
+            try:
+                hasher.verify(_dummy_password_hash(method, hasher), password)
+            except VerificationError:
+                pass
+        else:
+            check_password_hash(_dummy_password_hash(method), password)
+        return False
+    
+    def password_needs_rehash(self):
+        """Check if the stored hash was created with a different method or parameters than configured."""
+        method = current_app.config.get('PASSWORD_HASH_METHOD', 'argon2')
+        if method == 'argon2':
+            return not self.password_hash.startswith('$argon2id$') or _argon2().check_needs_rehash(self.password_hash)
+        return not self.password_hash.split('$', 1)[0].startswith(method)
+    
     def __repr__(self):
         return f'<User {self.email}>'
 
 
-class NavigationItem(db.Model):
+class NavigationItem(ReorderMixin, db.Model):
     """Navigation menu items."""
     __tablename__ = 'navigation_items'
     
@@ -45,6 +203,18 @@ class NavigationItem(db.Model):
     order = db.Column(db.Integer, default=0)
     is_active = db.Column(db.Boolean, default=True)
     
+    @classmethod
+    def get_active(cls):
+        """Active menu items in order, as cached dicts (shown on every page)."""
+        items = cache.get('query:nav_items')
+        if items is None:
+            items = [
+                {'id': item.id, 'title': item.title, 'slug': item.slug, 'icon_path': item.icon_path}
+                for item in cls.query.filter_by(is_active=True).order_by(cls.order)
+            ]
+            cache.set('query:nav_items', items, timeout=_query_cache_timeout())
+        return items
+    
     def __repr__(self):
         return f'<NavigationItem {self.title}>'
 
@@ -58,13 +228,13 @@ class Page(db.Model):
     title = db.Column(db.String(200), nullable=False)
     content = db.Column(db.Text)
     image_path = db.Column(db.String(255))
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
     
     def __repr__(self):
         return f'<Page {self.title}>'
 
 
-class WorkshopCategory(db.Model):
+class WorkshopCategory(ReorderMixin, db.Model):
     """Workshop categories (sub-navigation on Angebot page)."""
     __tablename__ = 'workshop_categories'
     
@@ -76,10 +246,12 @@ class WorkshopCategory(db.Model):
     no_dates_text = db.Column(db.String(255), default='Neue Daten folgen')  # Text when no courses
     order = db.Column(db.Integer, default=0)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
     
     # Relationship to courses
-    courses = db.relationship('Course', backref='workshop_category', lazy='dynamic', cascade='all, delete-orphan')
+    courses = db.relationship('Course', backref='workshop_category', cascade='all, delete-orphan')
+    
+    __table_args__ = (db.Index('ix_workshop_categories_active_order', 'is_active', 'order'),)
     
     def __repr__(self):
         return f'<WorkshopCategory {self.title}>'
@@ -101,21 +273,25 @@ class Course(db.Model):
     location_url = db.Column(db.String(500))  # Google Maps URL
     max_participants = db.Column(db.Integer)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    
+    # Participants with and without waitlist, kept up to date by the
+    # CourseRegistration events below so listings need no aggregate queries
+    participant_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    waitlist_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    registration_count = db.synonym('participant_count')
     
     # Relationship to registrations
-    registrations = db.relationship('CourseRegistration', backref='course', lazy='dynamic', cascade='all, delete-orphan')
+    registrations = db.relationship('CourseRegistration', backref='course', cascade='all, delete-orphan')
     
-    @property
-    def registration_count(self):
-        """Get total number of participants for this course (excluding waitlist)."""
-        from sqlalchemy import func
-        result = db.session.query(func.sum(CourseRegistration.num_participants)).filter(
-            CourseRegistration.course_id == self.id,
-            CourseRegistration.is_waitlist == False
-        ).scalar()
-        return result or 0
+    # Indexes for the public listing (active courses by date, per category)
+    # and the paginated admin list (newest first)
+    __table_args__ = (
+        db.Index('ix_courses_active_date', 'is_active', 'date'),
+        db.Index('ix_courses_category_active_date', 'workshop_category_id', 'is_active', 'date'),
+        db.Index('ix_courses_created_at', 'created_at'),
+    )
     
     @property
     def spots_available(self):
@@ -135,7 +311,7 @@ class Course(db.Model):
         return f'<Course {self.title}>'
 
 
-class CourseRegistration(db.Model):
+class CourseRegistration(BulkCreateMixin, db.Model):
     """Course registrations."""
     __tablename__ = 'course_registrations'
     
@@ -146,15 +322,83 @@ class CourseRegistration(db.Model):
     telefonnummer = db.Column(db.String(50), nullable=False)
     email = db.Column(db.String(120))  # Optional, for confirmation email
     num_participants = db.Column(db.Integer, default=1)  # Number of people in this registration
-    registered_at = db.Column(db.DateTime, default=datetime.utcnow)
+    registered_at = db.Column(db.DateTime, server_default=db.func.now())
     confirmation_sent = db.Column(db.Boolean, default=False)
     is_waitlist = db.Column(db.Boolean, default=False)  # True if on waitlist
     
+    # Covers lookups by course and the per-course participant sum (excluding waitlist)
+    __table_args__ = (db.Index('ix_course_registrations_course_waitlist', 'course_id', 'is_waitlist'),)
+    
+    @validates('telefonnummer')
+    def _normalize_telefonnummer(self, key, value):
+        """Store phone numbers in E.164 form so they compare and send consistently."""
+        return normalize_phone(value) if value else value
+    
+    @classmethod
+    def bulk_create(cls, rows):
+        """Insert registrations in one statement and update the course counts."""
+        rows = [{**row, 'telefonnummer': normalize_phone(row['telefonnummer'])} if row.get('telefonnummer') else row
+                for row in rows]
+        super().bulk_create(rows)
+        course_ids = {row['course_id'] for row in rows}
+        if course_ids:
+            refresh_registration_counts(db.session.connection(), course_ids)
+            _expire_registration_counts(db.session, course_ids)
+    
     def __repr__(self):
         return f'<CourseRegistration {self.vorname} {self.name} ({self.num_participants}) for Course {self.course_id}>'
 
 
-class ArtCategory(db.Model):
+def _registration_sum(course_id, is_waitlist):
+    """SQL expression for the number of participants registered for a course."""
+    return (
+        db.select(db.func.coalesce(db.func.sum(CourseRegistration.num_participants), 0))
+        .where(CourseRegistration.course_id == course_id, CourseRegistration.is_waitlist == is_waitlist)
+        .scalar_subquery()
+    )
+
+
+def refresh_registration_counts(connection, course_ids):
+    """Recompute the stored participant and waitlist counts of the given courses."""
+    courses = Course.__table__
+    connection.execute(
+        courses.update()
+        .where(courses.c.id.in_(course_ids))
+        .values(
+            participant_count=_registration_sum(courses.c.id, False),
+            waitlist_count=_registration_sum(courses.c.id, True),
+            updated_at=courses.c.updated_at,  # not an edit of the course itself
+        )
+    )
+
+
+def _expire_registration_counts(session, course_ids):
+    """Make loaded courses reload their counts on next access."""
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Course) and obj.id in course_ids:
+            session.expire(obj, ['participant_count', 'waitlist_count'])
+
+
+@db.event.listens_for(CourseRegistration, 'after_insert')
+@db.event.listens_for(CourseRegistration, 'after_update')
+@db.event.listens_for(CourseRegistration, 'after_delete')
+def _update_registration_counts(mapper, connection, target):
+    course_ids = {target.course_id, *db.inspect(target).attrs.course_id.history.deleted}
+    refresh_registration_counts(connection, course_ids)
+
+
+@db.event.listens_for(db.session.session_factory, 'after_flush')
+def _expire_flushed_registration_counts(session, flush_context):
+    course_ids = set()
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, CourseRegistration):
+            course_ids.add(obj.course_id)
+            course_ids.update(db.inspect(obj).attrs.course_id.history.deleted)
+    if course_ids:
+        _expire_registration_counts(session, course_ids)
+
+
+class ArtCategory(ReorderMixin, db.Model):
     """Art gallery categories."""
     __tablename__ = 'art_categories'
     
@@ -164,16 +408,21 @@ class ArtCategory(db.Model):
     featured_image_path = db.Column(db.String(255))
     order = db.Column(db.Integer, default=0)
     is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
     
     # Relationship to images
-    images = db.relationship('ArtImage', backref='category', lazy='dynamic', cascade='all, delete-orphan', order_by='ArtImage.order')
+    images = db.relationship('ArtImage', backref='category', cascade='all, delete-orphan', order_by='ArtImage.order')
+    
+    # Number of images; only set by queries that load it with with_expression()
+    image_count = db.query_expression()
+    
+    __table_args__ = (db.Index('ix_art_categories_active_order', 'is_active', 'order'),)
     
     def __repr__(self):
         return f'<ArtCategory {self.title}>'
 
 
-class ArtImage(db.Model):
+class ArtImage(BulkCreateMixin, db.Model):
     """Images in art gallery."""
     __tablename__ = 'art_images'
     
@@ -182,7 +431,9 @@ class ArtImage(db.Model):
     image_path = db.Column(db.String(255), nullable=False)
     caption = db.Column(db.String(255))
     order = db.Column(db.Integer, default=0)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    
+    __table_args__ = (db.Index('ix_art_images_category_order', 'category_id', 'order'),)
     
     def __repr__(self):
         return f'<ArtImage {self.id} in Category {self.category_id}>'
@@ -195,8 +446,21 @@ class LocationMapping(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     address = db.Column(db.String(255), unique=True, nullable=False, index=True)
     google_maps_url = db.Column(db.String(500))
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    
+    @classmethod
+    def upsert(cls, address, google_maps_url):
+        """Insert or update the URL for an address with one INSERT ... ON CONFLICT.
+        
+        The caller commits.
+        """
+        dialect = postgresql if db.session.get_bind().dialect.name == 'postgresql' else sqlite
+        stmt = dialect.insert(cls).values(address=address, google_maps_url=google_maps_url)
+        db.session.execute(stmt.on_conflict_do_update(
+            index_elements=[cls.address],
+            set_={'google_maps_url': stmt.excluded.google_maps_url, 'updated_at': db.func.now()},
+        ))
     
     def __repr__(self):
         return f'<LocationMapping {self.address}>'
@@ -209,13 +473,52 @@ class SiteSettings(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     key = db.Column(db.String(100), unique=True, nullable=False)
     value = db.Column(db.Text)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
+    
+    @classmethod
+    def get_all(cls):
+        """All settings as a cached {key: value} dict, loaded with one query."""
+        settings = cache.get('query:settings')
+        if settings is None:
+            settings = dict(db.session.query(cls.key, cls.value))
+            cache.set('query:settings', settings, timeout=_query_cache_timeout())
+        return settings
+    
+    @classmethod
+    def get_value(cls, key, default=None):
+        """Value of a setting, or default if it does not exist."""
+        value = cls.get_all().get(key)
+        return default if value is None else value
+    
+    @classmethod
+    def get_stored_value(cls, key, default=None):
+        """Value of a setting read from the database, bypassing the cache.
+        
+        For switches that must take effect at once in every worker (sms_enabled).
+        """
+        value = db.session.query(cls.value).filter_by(key=key).scalar()
+        return default if value is None else value
     
     def __repr__(self):
         return f'<SiteSetting {self.key}>'
 
 
-class MessageTemplate(db.Model):
+# {name} placeholders in message templates
+_PLACEHOLDER_RE = re.compile(r'\{(\w+)\}')
+
+
+def _fill_placeholders(text, context):
+    """Replace known {placeholders} in a single pass; unknown ones are kept as-is."""
+    def substitute(match):
+        key = match.group(1)
+        if key not in context:
+            return match.group(0)
+        value = context[key]
+        return str(value) if value else ''
+    return _PLACEHOLDER_RE.sub(substitute, text)
+
+
+class MessageTemplate(BulkCreateMixin, db.Model):
     """Email and SMS message templates."""
     __tablename__ = 'message_templates'
     
@@ -233,12 +536,28 @@ class MessageTemplate(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     
     # Audit
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    updated_at = db.Column(db.DateTime, server_default=db.func.now(), onupdate=db.func.now())
     
     # Unique constraint: one template per type+trigger combination
     __table_args__ = (db.UniqueConstraint('message_type', 'trigger', name='uq_message_template'),)
     
+    @classmethod
+    def get_active(cls, message_type, trigger):
+        """Active template for a type and trigger, or None.
+        
+        Returns a transient copy built from cached column values, which is
+        enough for rendering; query the model directly to edit a template.
+        """
+        cache_key = f'query:template:{message_type}:{trigger}'
+        cached = cache.get(cache_key)
+        if cached is None:
+            template = cls.query.filter_by(message_type=message_type, trigger=trigger, is_active=True).first()
+            cached = ({column.key: getattr(template, column.key) for column in cls.__table__.columns}
+                      if template is not None else None,)
+            cache.set(cache_key, cached, timeout=_query_cache_timeout())
+        return cls(**cached[0]) if cached[0] is not None else None
+    
     def __repr__(self):
         return f'<MessageTemplate {self.message_type}:{self.trigger}>'
     
@@ -250,19 +569,13 @@ class MessageTemplate(db.Model):
         - {kurstitel}, {datum}, {zeit}, {ort}, {ort_url}
         - {num_registered}, {num_waitlist}
         """
-        text = self.body
-        for key, value in context.items():
-            text = text.replace('{' + key + '}', str(value) if value else '')
-        return text
+        return _fill_placeholders(self.body, context)
     
     def render_subject(self, **context):
         """Render email subject with context variables."""
         if not self.subject:
             return ''
-        text = self.subject
-        for key, value in context.items():
-            text = text.replace('{' + key + '}', str(value) if value else '')
-        return text
+        return _fill_placeholders(self.subject, context)
 
 
 class MessageLog(db.Model):
@@ -276,7 +589,7 @@ class MessageLog(db.Model):
     trigger = db.Column(db.String(50), nullable=False)
     recipient = db.Column(db.String(255), nullable=False)  # Phone or email
     subject = db.Column(db.String(255))  # For emails
-    body = db.Column(db.Text, nullable=False)
+    body = db.deferred(db.Column(db.Text, nullable=False))  # Loaded on access; lists only need the metadata
     
     # Related entities
     registration_id = db.Column(db.Integer, db.ForeignKey('course_registrations.id'), nullable=True)
@@ -284,16 +597,19 @@ class MessageLog(db.Model):
     
     # Status
     status = db.Column(db.String(20), default='sent')  # sent, failed, pending
-    error_message = db.Column(db.Text)
+    error_message = db.deferred(db.Column(db.Text))
     external_id = db.Column(db.String(100))  # Twilio SID or email message ID
     
     # Timestamps
-    sent_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime, server_default=db.func.now())
     
     # Relationships
     registration = db.relationship('CourseRegistration', backref='messages')
     course = db.relationship('Course', backref='messages')
     
+    # Message history per course, ordered by send time
+    __table_args__ = (db.Index('ix_message_logs_course_sent', 'course_id', 'sent_at'),)
+    
     def __repr__(self):
         return f'<MessageLog {self.message_type} to {self.recipient}>'
 
@@ -319,15 +635,49 @@ class ScheduledMessage(db.Model):
     # Status
     status = db.Column(db.String(20), default='pending')  # pending, sent, cancelled, failed
     sent_at = db.Column(db.DateTime)
-    error_message = db.Column(db.Text)
+    error_message = db.deferred(db.Column(db.Text))  # Only written by the dispatcher
     
     # Timestamps
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, server_default=db.func.now())
+    
+    # Due-message scan of process_scheduled_messages, and pending messages per registration
+    __table_args__ = (
+        db.Index('ix_scheduled_messages_status_scheduled_for', 'status', 'scheduled_for'),
+        db.Index('ix_scheduled_messages_registration_status', 'registration_id', 'status'),
+    )
     
     # Relationships
     registration = db.relationship('CourseRegistration', backref='scheduled_messages')
     course = db.relationship('Course', backref='scheduled_messages')
     
+    @classmethod
+    def fetch_due(cls, now, limit=500):
+        """Pending messages due at now, with registration and course loaded in the same query."""
+        return (
+            cls.query
+            .filter(cls.status == 'pending', cls.scheduled_for <= now)
+            .options(db.joinedload(cls.registration).joinedload(CourseRegistration.course))
+            .order_by(cls.scheduled_for)
+            .limit(limit)
+            .all()
+        )
+    
     def __repr__(self):
         return f'<ScheduledMessage {self.trigger} for {self.scheduled_for}>'
 
+
+# Models with cached query results (get_active/get_value); a commit that
+# writes any of them (ORM flush or reorder) clears the cache, including from CLI commands
+_QUERY_CACHED_MODELS = (NavigationItem, SiteSettings, MessageTemplate)
+
+
+@db.event.listens_for(db.session.session_factory, 'before_flush')
+def _mark_query_cache_stale(session, flush_context, instances):
+    if any(isinstance(obj, _QUERY_CACHED_MODELS) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info['query_cache_stale'] = True
+
+
+@db.event.listens_for(db.session.session_factory, 'after_commit')
+def _clear_stale_query_cache(session):
+    if session.info.pop('query_cache_stale', False):
+        cache.clear()
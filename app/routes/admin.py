@@ -1,4 +1,5 @@
 """Admin routes and authentication."""
+import io
 import logging
 import re
 from flask import (
@@ -9,92 +10,248 @@ from flask import (
     url_for,
     flash,
     current_app,
+    g,
     jsonify,
 )
 from flask_login import login_user, logout_user, login_required, current_user
-from app import db, limiter
-from app.models import User, Course, CourseRegistration, ArtCategory, ArtImage, Page, NavigationItem, WorkshopCategory, LocationMapping, MessageTemplate, SiteSettings
+from app import db, limiter, UPLOAD_SUBFOLDERS
+from app.models import User, Course, CourseRegistration, ArtCategory, ArtImage, Page, NavigationItem, WorkshopCategory, LocationMapping, MessageTemplate, ScheduledMessage, SiteSettings, clear_user_cache
 from app.services.messaging import send_promoted_message
 from werkzeug.utils import secure_filename
 import os
-from pathlib import Path
-from datetime import datetime
-from typing import Optional
+import secrets
+import shutil
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 bp = Blueprint('admin', __name__, url_prefix='/admin')
 
+# Minimum time between two stored last_login updates of a user
+LAST_LOGIN_UPDATE_INTERVAL = timedelta(minutes=5)
+
+# Buffer size when an upload has to be copied instead of linked
+UPLOAD_COPY_CHUNK_SIZE = 64 * 1024
+# Bytes per copy_file_range/sendfile call for the same case
+UPLOAD_KERNEL_CHUNK_SIZE = 1 << 20
+
+# Formatting characters (spaces, dashes, parentheses) dropped before phone validation
+_PHONE_STRIP_RE = re.compile(r'[\s\-\(\)]')
+# Optional + at start, then 9-15 digits
+_PHONE_RE = re.compile(r'^\+?\d{9,15}$')
+
+# fdatasync skips the metadata flush; not available on macOS and Windows
+_datasync = getattr(os, 'fdatasync', os.fsync)
+
+# Stores the files of multi-image uploads in parallel (threads start on first use)
+_upload_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='upload')
+
+# Sends waitlist promotion SMS/emails after the response (threads start on first use)
+_notification_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='notify')
+
+
+def _begin_write_transaction():
+    """Take the SQLite write lock before a read-then-write sequence.
+
+    Concurrent writers then wait for each other (up to the busy_timeout), so
+    what was read cannot change before the write. Called only right before
+    such a sequence: the lock blocks every other writer, public registrations
+    included, so slow work (password hashing, storing uploads) comes first.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return
+    connection = db.session.connection()
+    if not connection.connection.driver_connection.in_transaction:
+        connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+@bp.after_request
+def _revalidate_admin_pages(response):
+    """Let browsers revalidate admin pages instead of downloading them again.
+
+    The ETag is a hash of the rendered page: registration counts change
+    without touching updated_at, so no cheaper database fingerprint is exact.
+    """
+    if request.method == 'GET' and response.status_code == 200 and response.mimetype == 'text/html':
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.add_etag()
+        response.make_conditional(request)
+    return response
+
 
 def validate_phone(phone: str) -> bool:
     """Validate phone number - flexible format allowing Swiss/international numbers."""
     if not phone:
         return False
-    # Remove all formatting characters: spaces, dashes, parentheses
-    cleaned = re.sub(r'[\s\-\(\)]', '', phone)
-    # Allow optional + at start, then 9-15 digits
-    return bool(re.match(r'^\+?\d{9,15}$', cleaned))
+    return bool(_PHONE_RE.match(_PHONE_STRIP_RE.sub('', phone)))
 
 
 def validate_email(email: str) -> bool:
     """Basic email validation."""
     if not email:
         return True  # Email is optional
-    pattern = r'^[^\s@]+@[^\s@]+\.[^\s@]+$'
-    return bool(re.match(pattern, email))
+    # local@domain.tld without a regex: exactly one @, a dot inside the domain, no whitespace
+    local, _, domain = email.rpartition('@')
+    return bool(local) and '@' not in local and '.' in domain[1:-1] and not any(map(str.isspace, email))
+
+
+def parse_datetime(value: str) -> datetime:
+    """Parse the value of a date or datetime-local input.
+
+    Raises ValueError for invalid input and for values with a time zone,
+    since course dates are stored as naive local times.
+    """
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        raise ValueError(f'Unexpected time zone in {value!r}')
+    return parsed
 
 
 def allowed_file(filename: str) -> bool:
     """Check allowed file extensions."""
-    if not filename or '.' not in filename:
+    if not filename:
         return False
-    ext = filename.rsplit('.', 1)[1].lower()
-    return ext in current_app.config.get('ALLOWED_EXTENSIONS', set())
+    _, dot, ext = filename.rpartition('.')
+    return bool(dot) and ext.lower() in current_app.allowed_extensions
 
 
 def save_file(file_storage, subfolder: str) -> Optional[str]:
-    """Save an uploaded file and return relative path inside uploads."""
+    """Save an uploaded file and return relative path inside uploads.
+
+    The file name gets a random prefix, so concurrent uploads do not collide.
+    """
+    target = _upload_target(file_storage, subfolder)
+    if target is None:
+        return None
+    saved, file_path = target
+    _store_upload(file_storage.stream, file_path)
+    return saved
+
+
+def _upload_target(file_storage, subfolder: str) -> Optional[Tuple[str, str]]:
+    """Validate an upload and return its relative path and absolute target path."""
+    # Only the folders created at startup; also keeps paths inside the upload folder
+    if subfolder not in UPLOAD_SUBFOLDERS:
+        raise ValueError(f'Unknown upload subfolder: {subfolder!r}')
     if not file_storage or not file_storage.filename:
         return None
     if not allowed_file(file_storage.filename):
         flash('Ungültiger Dateityp. Erlaubt sind png/jpg/jpeg/gif.', 'error')
         return None
-    filename = secure_filename(file_storage.filename)
-    timestamp = datetime.utcnow().strftime('%Y%m%d%H%M%S%f')
-    filename = f"{timestamp}_{filename}"
-    upload_root: Path = current_app.config['UPLOAD_FOLDER']
-    target_dir = upload_root / subfolder
-    target_dir.mkdir(parents=True, exist_ok=True)
-    file_path = target_dir / filename
-    file_storage.save(str(file_path))
-    return f"{subfolder}/{filename}"
+    filename = f"{secrets.token_hex(8)}_{secure_filename(file_storage.filename)}"
+    # secure_filename strips separators and '..', so the file stays in the subfolder
+    return f"{subfolder}/{filename}", os.path.join(current_app.upload_folder_abs, subfolder, filename)
+
+
+def _store_upload(stream, file_path: str) -> None:
+    """Write an uploaded file stream to file_path.
+
+    Uploads are spooled to a temporary file next to the upload folder (see
+    UploadRequest), so it is usually enough to hard-link that file into place.
+    Either way the data is on disk and the file appears complete under its
+    final name before the caller commits the row that references it.
+    """
+    tmp_name = getattr(stream, 'name', None)
+    if isinstance(tmp_name, str):
+        stream.flush()
+        _datasync(stream.fileno())
+        try:
+            os.link(tmp_name, file_path)
+            # Temporary files are private (0600); Apache serves uploads directly
+            os.chmod(file_path, 0o644)
+            return
+        except OSError:
+            pass
+    part_path = os.path.join(os.path.dirname(file_path), f'.{uuid.uuid4().hex}.part')
+    try:
+        _fast_copy(stream, part_path)
+        os.replace(part_path, file_path)
+    except BaseException:
+        if os.path.exists(part_path):
+            os.remove(part_path)
+        raise
+
+
+def _fast_copy(stream, file_path: str) -> None:
+    """Copy a file stream to file_path, in the kernel when the stream is a real file."""
+    stream.seek(0)
+    with open(file_path, 'wb') as dst:
+        try:
+            src_fd = stream.fileno()
+        except (AttributeError, OSError, io.UnsupportedOperation):
+            src_fd = None
+        copied = False
+        if src_fd is not None:
+            stream.flush()
+            try:
+                _copy_fd(src_fd, dst.fileno())
+                copied = True
+            except OSError:
+                # Not supported for this pair of files; start over in userspace
+                stream.seek(0)
+                dst.seek(0)
+                dst.truncate()
+        if not copied:
+            shutil.copyfileobj(stream, dst, UPLOAD_COPY_CHUNK_SIZE)
+            dst.flush()
+        _datasync(dst.fileno())
+
+
+def _copy_fd(src_fd: int, dst_fd: int) -> None:
+    """Copy src_fd to dst_fd with copy_file_range, or sendfile on older kernels."""
+    if hasattr(os, 'copy_file_range'):
+        try:
+            while os.copy_file_range(src_fd, dst_fd, UPLOAD_KERNEL_CHUNK_SIZE):
+                pass
+            return
+        except OSError:
+            pass
+    while os.sendfile(dst_fd, src_fd, None, UPLOAD_KERNEL_CHUNK_SIZE):
+        pass
 
 
 # --- Inline editing API ---
 
 
+def _apply_inline_edit(obj, data, fields) -> bool:
+    """Set the stripped values of the given JSON keys on obj's attributes.
+
+    Commits only when a value differs from the stored one; inline editors also
+    save on blur without edits, and those no-op saves skip the write and keep
+    the page cache. Returns whether anything changed.
+    """
+    changed = False
+    for key, attribute in fields.items():
+        value = data.get(key)
+        if value is not None and value.strip() != getattr(obj, attribute):
+            setattr(obj, attribute, value.strip())
+            changed = True
+    if changed:
+        db.session.commit()
+    else:
+        g.nothing_changed = True
+    return changed
+
+
 @bp.route('/api/page/<int:page_id>/content', methods=['POST'])
 @login_required
 def update_page_content(page_id: int):
     """Update page content or title inline."""
-    page = Page.query.get_or_404(page_id)
+    page = db.get_or_404(Page, page_id)
     data = request.get_json(silent=True) or {}
-    content = data.get('content')
-    title = data.get('title')
-
-    if content is not None:
-        page.content = content.strip()
-    if title is not None:
-        page.title = title.strip()
-    db.session.commit()
-    return {"success": True}
+    changed = _apply_inline_edit(page, data, {'content': 'content', 'title': 'title'})
+    return {"success": True, "changed": changed}
 
 
 @bp.route('/api/page/<int:page_id>/image', methods=['POST'])
 @login_required
 def update_page_image(page_id: int):
     """Update page image inline."""
-    page = Page.query.get_or_404(page_id)
+    page = db.get_or_404(Page, page_id)
     image_file = request.files.get('image')
     saved = save_file(image_file, 'pages') if image_file else None
     if saved:
@@ -108,17 +265,10 @@ def update_page_image(page_id: int):
 @login_required
 def update_course_content(course_id: int):
     """Update course description or title inline."""
-    course = Course.query.get_or_404(course_id)
+    course = db.get_or_404(Course, course_id)
     data = request.get_json(silent=True) or {}
-    content = data.get('content')
-    title = data.get('title')
-
-    if content is not None:
-        course.description = content.strip()
-    if title is not None:
-        course.title = title.strip()
-    db.session.commit()
-    return {"success": True}
+    changed = _apply_inline_edit(course, data, {'content': 'description', 'title': 'title'})
+    return {"success": True, "changed": changed}
 
 
 @bp.route('/api/course', methods=['POST'])
@@ -142,7 +292,7 @@ def api_create_course():
     parsed_date = None
     if date_str:
         try:
-            parsed_date = datetime.strptime(date_str, '%Y-%m-%dT%H:%M')
+            parsed_date = parse_datetime(date_str)
         except ValueError:
             pass
     
@@ -165,7 +315,7 @@ def api_create_course():
 @login_required
 def api_get_course(course_id: int):
     """Get course data for editing."""
-    course = Course.query.get_or_404(course_id)
+    course = db.get_or_404(Course, course_id)
     return {
         "success": True,
         "course": {
@@ -186,8 +336,7 @@ def api_get_course(course_id: int):
 @login_required
 def api_update_course(course_id: int):
     """Update a course via AJAX."""
-    from flask import jsonify
-    course = Course.query.get_or_404(course_id)
+    course = db.get_or_404(Course, course_id)
     data = request.get_json(silent=True) or {}
     
     if 'title' in data:
@@ -196,7 +345,7 @@ def api_update_course(course_id: int):
         course.description = data['description'].strip() if data['description'] else None
     if 'date' in data and data['date']:
         try:
-            course.date = datetime.strptime(data['date'], '%Y-%m-%d')
+            course.date = parse_datetime(data['date'])
         except ValueError:
             pass
     if 'time_info' in data:
@@ -214,12 +363,7 @@ def api_update_course(course_id: int):
     location = course.location
     location_url = course.location_url
     if location and location_url:
-        existing_mapping = LocationMapping.query.filter_by(address=location).first()
-        if existing_mapping:
-            existing_mapping.google_maps_url = location_url
-        else:
-            new_mapping = LocationMapping(address=location, google_maps_url=location_url)
-            db.session.add(new_mapping)
+        LocationMapping.upsert(location, location_url)
     
     db.session.commit()
     return jsonify({"success": True, "message": "Kurs aktualisiert"})
@@ -229,7 +373,7 @@ def api_update_course(course_id: int):
 @login_required
 def api_delete_course(course_id: int):
     """Delete a course via AJAX."""
-    course = Course.query.get_or_404(course_id)
+    course = db.get_or_404(Course, course_id)
     db.session.delete(course)
     db.session.commit()
     return {"success": True}
@@ -239,7 +383,7 @@ def api_delete_course(course_id: int):
 @login_required
 def update_course_image(course_id: int):
     """Update course image inline."""
-    course = Course.query.get_or_404(course_id)
+    course = db.get_or_404(Course, course_id)
     image_file = request.files.get('image')
     saved = save_file(image_file, 'courses') if image_file else None
     if saved:
@@ -253,24 +397,17 @@ def update_course_image(course_id: int):
 @login_required
 def update_art_category_content(category_id: int):
     """Update art category title/description inline."""
-    category = ArtCategory.query.get_or_404(category_id)
+    category = db.get_or_404(ArtCategory, category_id)
     data = request.get_json(silent=True) or {}
-    title = data.get('title')
-    description = data.get('description')
-
-    if title is not None:
-        category.title = title.strip()
-    if description is not None:
-        category.description = description.strip()
-    db.session.commit()
-    return {"success": True}
+    changed = _apply_inline_edit(category, data, {'title': 'title', 'description': 'description'})
+    return {"success": True, "changed": changed}
 
 
 @bp.route('/api/art-category/<int:category_id>/image', methods=['POST'])
 @login_required
 def update_art_category_image(category_id: int):
     """Update art category featured image inline."""
-    category = ArtCategory.query.get_or_404(category_id)
+    category = db.get_or_404(ArtCategory, category_id)
     image_file = request.files.get('image')
     saved = save_file(image_file, 'art') if image_file else None
     if saved:
@@ -309,7 +446,7 @@ def api_create_art_category():
 @login_required
 def api_delete_art_category(category_id: int):
     """Delete an art category via AJAX."""
-    category = ArtCategory.query.get_or_404(category_id)
+    category = db.get_or_404(ArtCategory, category_id)
     db.session.delete(category)
     db.session.commit()
     return {"success": True}
@@ -322,11 +459,7 @@ def api_reorder_art_categories():
     data = request.get_json()
     order_data = data.get('order', [])
     
-    for item in order_data:
-        category = ArtCategory.query.get(item['id'])
-        if category:
-            category.order = item['order']
-    
+    ArtCategory.reorder(order_data)
     db.session.commit()
     return jsonify({"success": True})
 
@@ -335,7 +468,7 @@ def api_reorder_art_categories():
 @login_required
 def api_upload_art_images(category_id: int):
     """Upload one or more images to an art category."""
-    category = ArtCategory.query.get_or_404(category_id)
+    category = db.get_or_404(ArtCategory, category_id)
     images = request.files.getlist('images')
     caption = request.form.get('caption', '').strip()
     
@@ -343,25 +476,29 @@ def api_upload_art_images(category_id: int):
         flash('Keine Bilder ausgewählt.', 'error')
         return redirect(url_for('art.gallery', category_id=category_id))
     
-    uploaded_count = 0
-    max_order = db.session.query(db.func.max(ArtImage.order)).filter_by(category_id=category_id).scalar() or 0
-    
+    uploads = []
     for image_file in images:
-        if image_file and image_file.filename:
-            saved = save_file(image_file, 'art')
-            if saved:
-                max_order += 1
-                art_image = ArtImage(
-                    category_id=category_id,
-                    image_path=saved,
-                    caption=caption if caption else None,
-                    order=max_order,
-                )
-                db.session.add(art_image)
-                uploaded_count += 1
-    
+        target = _upload_target(image_file, 'art')
+        if target:
+            uploads.append((image_file.stream, *target))
+    
+    # Store the files concurrently, mostly waiting on fdatasync outside the GIL
+    list(_upload_pool.map(lambda upload: _store_upload(upload[0], upload[2]), uploads))
+    
+    # Locked from reading the last position until the commit, so concurrent uploads do not reuse it
+    _begin_write_transaction()
+    max_order = db.session.query(db.func.coalesce(db.func.max(ArtImage.order), 0)).filter_by(category_id=category_id).scalar()
+    rows = [{
+        'category_id': category_id,
+        'image_path': saved,
+        'caption': caption if caption else None,
+        'order': max_order + number,
+    } for number, (_, saved, _) in enumerate(uploads, start=1)]
+    
+    # One multi-row INSERT for the whole batch
+    ArtImage.bulk_create(rows)
     db.session.commit()
-    flash(f'{uploaded_count} Bild(er) hochgeladen.', 'success')
+    flash(f'{len(rows)} Bild(er) hochgeladen.', 'success')
     return redirect(url_for('art.gallery', category_id=category_id))
 
 
@@ -369,36 +506,52 @@ def api_upload_art_images(category_id: int):
 @login_required
 def api_delete_art_image(image_id: int):
     """Delete an art image via AJAX."""
-    image = ArtImage.query.get_or_404(image_id)
+    image = db.get_or_404(ArtImage, image_id)
     db.session.delete(image)
     db.session.commit()
     return {"success": True}
 
 
+def _login_email_key():
+    """Rate-limit key for failed logins, per account rather than per client address."""
+    return 'login:' + (request.form.get('email') or '').strip().lower()
+
+
 @bp.route('/login', methods=['GET', 'POST'])
 @limiter.limit("5 per minute", methods=["POST"])
+@limiter.limit(lambda: current_app.config['LOGIN_FAILURE_LIMIT'], methods=["POST"],
+               key_func=_login_email_key, deduct_when=lambda response: g.get('login_failed', False))
 def login():
     """Admin login page."""
     if current_user.is_authenticated:
         return redirect(url_for('public.index'))
     
     if request.method == 'POST':
-        email = request.form.get('email')
-        password = request.form.get('password')
+        email = (request.form.get('email') or '').strip().lower()
+        password = request.form.get('password') or ''
         
         user = User.query.filter_by(email=email).first()
+        if user is None:
+            User.check_password_without_user(password)
         
         if user and user.check_password(password):
-            logger.info(f"Successful login for user: {email}")
+            logger.info("Successful login for user: %s", email)
             login_user(user, remember=True)
-            from datetime import datetime
-            user.last_login = datetime.utcnow()
-            db.session.commit()
+            now = datetime.utcnow()
+            # last_login is informational, so repeated logins skip the write
+            if user.last_login is None or now - user.last_login > LAST_LOGIN_UPDATE_INTERVAL:
+                user.last_login = now
+            if user.password_needs_rehash():
+                user.set_password(password)
+            if db.session.dirty:
+                db.session.commit()
+                clear_user_cache(user.id)
             
             next_page = request.args.get('next')
             return redirect(next_page or url_for('public.index'))
         else:
-            logger.warning(f"Failed login attempt for email: {email}")
+            logger.warning("Failed login attempt for email: %s", email)
+            g.login_failed = True
             flash('Ungültige E-Mail oder Passwort.', 'error')
     
     return render_template('admin/login.html')
@@ -417,8 +570,11 @@ def logout():
 @login_required
 def admin_users():
     """Manage admin users."""
-    users = User.query.order_by(User.created_at.desc()).all()
-    nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
+    # Everything but the password hash
+    users = User.query.options(
+        db.load_only(User.id, User.email, User.name, User.created_at, User.last_login)
+    ).order_by(User.created_at.desc()).all()
+    nav_items = NavigationItem.get_active()
     return render_template('admin/users.html', users=users, nav_items=nav_items)
 
 
@@ -429,7 +585,7 @@ def api_create_user():
     data = request.get_json()
     
     name = data.get('name', '').strip()
-    email = data.get('email', '').strip()
+    email = data.get('email', '').strip().lower()
     password = data.get('password', '')
     
     if not name or not email or not password:
@@ -442,7 +598,7 @@ def api_create_user():
         return jsonify({'success': False, 'error': 'Ungültige E-Mail-Adresse'}), 400
     
     # Check if email already exists
-    if User.query.filter_by(email=email).first():
+    if db.session.query(User.id).filter_by(email=email).first():
         return jsonify({'success': False, 'error': 'E-Mail-Adresse bereits vergeben'}), 400
     
     user = User(name=name, email=email)
@@ -457,11 +613,11 @@ def api_create_user():
 @login_required
 def api_update_user(user_id):
     """Update an admin user."""
-    user = User.query.get_or_404(user_id)
+    user = db.get_or_404(User, user_id)
     data = request.get_json()
     
     name = data.get('name', '').strip()
-    email = data.get('email', '').strip()
+    email = data.get('email', '').strip().lower()
     password = data.get('password', '')
     
     if not name or not email:
@@ -471,8 +627,7 @@ def api_update_user(user_id):
         return jsonify({'success': False, 'error': 'Ungültige E-Mail-Adresse'}), 400
     
     # Check if email already exists for another user
-    existing = User.query.filter_by(email=email).first()
-    if existing and existing.id != user_id:
+    if db.session.query(User.id).filter(User.email == email, User.id != user_id).first():
         return jsonify({'success': False, 'error': 'E-Mail-Adresse bereits vergeben'}), 400
     
     user.name = name
@@ -484,6 +639,7 @@ def api_update_user(user_id):
         user.set_password(password)
     
     db.session.commit()
+    clear_user_cache(user_id)
     return jsonify({'success': True})
 
 
@@ -495,12 +651,24 @@ def api_delete_user(user_id):
     if user_id == current_user.id:
         return jsonify({'success': False, 'error': 'Du kannst dich nicht selbst löschen'}), 400
     
-    user = User.query.get_or_404(user_id)
+    user = db.get_or_404(User, user_id)
     db.session.delete(user)
     db.session.commit()
+    clear_user_cache(user_id)
     return jsonify({'success': True})
 
 
+# Display names of the message template triggers
+_TRIGGER_LABELS = {
+    'registration_confirmed': 'Anmeldung bestätigt',
+    'registration_mixed': 'Teilweise Warteliste',
+    'registration_waitlist': 'Warteliste',
+    'promoted_from_waitlist': 'Von Warteliste angemeldet',
+    'reminder_1day': 'Erinnerung (1 Tag vorher)',
+    'admin_new_registration': 'Admin-Benachrichtigung (neue Anmeldung)'
+}
+
+
 @bp.route('/message_templates')
 @login_required
 def message_templates():
@@ -510,19 +678,10 @@ def message_templates():
         MessageTemplate.trigger
     ).all()
     
-    trigger_labels = {
-        'registration_confirmed': 'Anmeldung bestätigt',
-        'registration_mixed': 'Teilweise Warteliste',
-        'registration_waitlist': 'Warteliste',
-        'promoted_from_waitlist': 'Von Warteliste angemeldet',
-        'reminder_1day': 'Erinnerung (1 Tag vorher)',
-        'admin_new_registration': 'Admin-Benachrichtigung (neue Anmeldung)'
-    }
-    
-    nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
+    nav_items = NavigationItem.get_active()
     return render_template('admin/message_templates.html', 
                           templates=templates, 
-                          trigger_labels=trigger_labels,
+                          trigger_labels=_TRIGGER_LABELS,
                           nav_items=nav_items)
 
 
@@ -530,7 +689,7 @@ def message_templates():
 @login_required
 def api_update_message_template(template_id):
     """Update a message template."""
-    template = MessageTemplate.query.get_or_404(template_id)
+    template = db.get_or_404(MessageTemplate, template_id)
     data = request.get_json()
     
     template.body = data.get('body', template.body)
@@ -548,21 +707,18 @@ def api_update_message_template(template_id):
 def dashboard():
     """Redirect to homepage - admin functions are now in-place."""
     return redirect(url_for('public.index'))
-    recent_registrations = CourseRegistration.query.order_by(CourseRegistration.registered_at.desc()).limit(10).all()
-    
-    return render_template('admin/dashboard.html', 
-                         total_courses=total_courses,
-                         total_registrations=total_registrations,
-                         active_courses=active_courses,
-                         recent_registrations=recent_registrations)
 
 
 @bp.route('/courses')
 @login_required
 def courses():
     """Manage courses."""
-    courses = Course.query.order_by(Course.created_at.desc()).all()
-    return render_template('admin/courses.html', courses=courses)
+    page = request.args.get('page', 1, type=int)
+    pagination = Course.query.options(
+        db.load_only(Course.id, Course.title, Course.date, Course.location, Course.is_active, Course.participant_count),
+        db.raiseload('*'),
+    ).order_by(Course.created_at.desc()).paginate(page=page, per_page=current_app.config['ITEMS_PER_PAGE'], error_out=False)
+    return render_template('admin/courses.html', courses=pagination.items, pagination=pagination)
 
 
 @bp.route('/courses/create', methods=['POST'])
@@ -589,7 +745,7 @@ def create_course():
     parsed_date = None
     if date_str:
         try:
-            parsed_date = datetime.strptime(date_str, '%Y-%m-%dT%H:%M')
+            parsed_date = parse_datetime(date_str)
         except ValueError:
             flash('Ungültiges Datumsformat. Bitte Datum/Zeit neu eingeben.', 'error')
             return redirect(url_for('admin.courses'))
@@ -614,7 +770,7 @@ def create_course():
 @login_required
 def edit_course(course_id):
     """Edit an existing course."""
-    course = Course.query.get_or_404(course_id)
+    course = db.get_or_404(Course, course_id)
 
     if request.method == 'POST':
         title = request.form.get('title', '').strip()
@@ -631,7 +787,7 @@ def edit_course(course_id):
         parsed_date = None
         if date_str:
             try:
-                parsed_date = datetime.strptime(date_str, '%Y-%m-%dT%H:%M')
+                parsed_date = parse_datetime(date_str)
             except ValueError:
                 flash('Ungültiges Datumsformat. Bitte Datum/Zeit neu eingeben.', 'error')
                 return redirect(url_for('admin.edit_course', course_id=course_id))
@@ -660,7 +816,7 @@ def edit_course(course_id):
 @login_required
 def delete_course(course_id):
     """Delete a course."""
-    course = Course.query.get_or_404(course_id)
+    course = db.get_or_404(Course, course_id)
     db.session.delete(course)
     db.session.commit()
     flash('Kurs wurde gelöscht.', 'info')
@@ -671,9 +827,9 @@ def delete_course(course_id):
 @login_required
 def course_registrations(course_id):
     """View registrations for a specific course."""
-    course = Course.query.get_or_404(course_id)
-    registrations = course.registrations.order_by(CourseRegistration.registered_at.desc()).all()
-    nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
+    course = db.get_or_404(Course, course_id)
+    registrations = CourseRegistration.query.filter_by(course_id=course.id).options(db.raiseload('*')).order_by(CourseRegistration.registered_at.desc()).all()
+    nav_items = NavigationItem.get_active()
     return render_template('courses/registrations.html', course=course, registrations=registrations, nav_items=nav_items)
 
 
@@ -681,8 +837,7 @@ def course_registrations(course_id):
 @login_required
 def api_delete_registration(registration_id):
     """Delete a registration."""
-    from app.models import ScheduledMessage
-    registration = CourseRegistration.query.get_or_404(registration_id)
+    registration = db.get_or_404(CourseRegistration, registration_id)
     # Delete any scheduled messages for this registration first
     ScheduledMessage.query.filter_by(registration_id=registration_id).delete()
     db.session.delete(registration)
@@ -690,11 +845,27 @@ def api_delete_registration(registration_id):
     return jsonify({'success': True})
 
 
+def _send_promoted_message_later(registration_id: int) -> None:
+    """Send the promotion notification in the background, so the response does not wait on Twilio/SMTP."""
+    app = current_app._get_current_object()
+    
+    def send():
+        with app.app_context():
+            try:
+                send_promoted_message(db.session.get(CourseRegistration, registration_id))
+            except Exception as e:
+                logger.error("Error sending promotion notification: %s", e)
+    
+    _notification_pool.submit(send)
+
+
 @bp.route('/api/registration/<int:registration_id>/promote', methods=['POST'])
 @login_required
 def api_promote_registration(registration_id):
     """Move a registration from waitlist to registered."""
-    registration = CourseRegistration.query.get_or_404(registration_id)
+    # Free spots are checked and taken under the write lock
+    _begin_write_transaction()
+    registration = db.get_or_404(CourseRegistration, registration_id)
     
     if not registration.is_waitlist:
         return jsonify({'success': False, 'error': 'Diese Person ist bereits angemeldet'}), 400
@@ -711,12 +882,7 @@ def api_promote_registration(registration_id):
         # Promote entire registration
         registration.is_waitlist = False
         db.session.commit()
-        
-        # Send promotion notification
-        try:
-            send_promoted_message(registration)
-        except Exception as e:
-            logger.error(f"Error sending promotion notification: {e}")
+        _send_promoted_message_later(registration.id)
         
         return jsonify({'success': True, 'message': f'{num_participants} Person(en) angemeldet'})
     else:
@@ -735,12 +901,7 @@ def api_promote_registration(registration_id):
         )
         db.session.add(new_reg)
         db.session.commit()
-        
-        # Send promotion notification for the promoted registration
-        try:
-            send_promoted_message(new_reg)
-        except Exception as e:
-            logger.error(f"Error sending promotion notification: {e}")
+        _send_promoted_message_later(new_reg.id)
         
         return jsonify({'success': True, 'message': f'{spots_available} Person(en) angemeldet, {registration.num_participants} bleiben auf der Warteliste'})
 
@@ -749,7 +910,7 @@ def api_promote_registration(registration_id):
 @login_required
 def api_update_registration(registration_id):
     """Update a registration."""
-    registration = CourseRegistration.query.get_or_404(registration_id)
+    registration = db.get_or_404(CourseRegistration, registration_id)
     data = request.get_json()
     
     telefonnummer = data.get('telefonnummer', registration.telefonnummer)
@@ -782,7 +943,7 @@ def api_update_registration(registration_id):
 @login_required
 def api_create_registration(course_id):
     """Create a new registration for a course."""
-    course = Course.query.get_or_404(course_id)
+    course = db.get_or_404(Course, course_id)
     data = request.get_json()
     
     telefonnummer = data.get('telefonnummer', '').strip()
@@ -813,7 +974,13 @@ def api_create_registration(course_id):
 @login_required
 def art():
     """Manage art categories."""
-    categories = ArtCategory.query.order_by(ArtCategory.order).all()
+    # Only the number of images is shown; count them in the same query
+    image_count = db.select(db.func.count(ArtImage.id)).where(ArtImage.category_id == ArtCategory.id).scalar_subquery()
+    categories = ArtCategory.query.options(
+        db.load_only(ArtCategory.id, ArtCategory.title, ArtCategory.description, ArtCategory.order, ArtCategory.is_active),
+        db.with_expression(ArtCategory.image_count, image_count),
+        db.raiseload('*'),
+    ).order_by(ArtCategory.order).all()
     return render_template('admin/art.html', categories=categories)
 
 
@@ -852,7 +1019,7 @@ def create_art_category():
 @login_required
 def update_art_category(category_id):
     """Update an art category."""
-    category = ArtCategory.query.get_or_404(category_id)
+    category = db.get_or_404(ArtCategory, category_id)
     title = request.form.get('title', '').strip()
     if not title:
         flash('Titel ist erforderlich.', 'error')
@@ -878,7 +1045,7 @@ def update_art_category(category_id):
 @login_required
 def delete_art_category(category_id):
     """Delete an art category."""
-    category = ArtCategory.query.get_or_404(category_id)
+    category = db.get_or_404(ArtCategory, category_id)
     db.session.delete(category)
     db.session.commit()
     flash('Kategorie gelöscht.', 'info')
@@ -889,7 +1056,7 @@ def delete_art_category(category_id):
 @login_required
 def manage_art_images(category_id):
     """Manage images for a category."""
-    category = ArtCategory.query.get_or_404(category_id)
+    category = db.get_or_404(ArtCategory, category_id)
 
     if request.method == 'POST':
         image_file = request.files.get('image')
@@ -912,7 +1079,7 @@ def manage_art_images(category_id):
 
         return redirect(url_for('admin.manage_art_images', category_id=category_id))
 
-    images = category.images.order_by(ArtImage.order).all()
+    images = category.images
     return render_template('admin/art_images.html', category=category, images=images)
 
 
@@ -920,7 +1087,7 @@ def manage_art_images(category_id):
 @login_required
 def delete_art_image(image_id):
     """Delete an art image."""
-    image = ArtImage.query.get_or_404(image_id)
+    image = db.get_or_404(ArtImage, image_id)
     category_id = image.category_id
     db.session.delete(image)
     db.session.commit()
@@ -964,7 +1131,7 @@ def create_page():
 @login_required
 def update_page(page_id):
     """Update existing page."""
-    page = Page.query.get_or_404(page_id)
+    page = db.get_or_404(Page, page_id)
     title = request.form.get('title', '').strip()
     slug = request.form.get('slug', '').strip()
     content = request.form.get('content', '').strip()
@@ -992,7 +1159,7 @@ def update_page(page_id):
 @login_required
 def delete_page(page_id):
     """Delete a page."""
-    page = Page.query.get_or_404(page_id)
+    page = db.get_or_404(Page, page_id)
     db.session.delete(page)
     db.session.commit()
     flash('Seite gelöscht.', 'info')
@@ -1042,7 +1209,7 @@ def create_navigation():
 @login_required
 def update_navigation(item_id):
     """Update a navigation item."""
-    nav_item = NavigationItem.query.get_or_404(item_id)
+    nav_item = db.get_or_404(NavigationItem, item_id)
     title = request.form.get('title', '').strip()
     slug = request.form.get('slug', '').strip()
 
@@ -1070,7 +1237,7 @@ def update_navigation(item_id):
 @login_required
 def delete_navigation(item_id):
     """Delete a navigation item."""
-    nav_item = NavigationItem.query.get_or_404(item_id)
+    nav_item = db.get_or_404(NavigationItem, item_id)
     db.session.delete(nav_item)
     db.session.commit()
     flash('Navigationseintrag gelöscht.', 'info')
@@ -1083,10 +1250,7 @@ def api_reorder_navigation():
     """Reorder navigation items."""
     data = request.get_json(silent=True) or {}
     order_list = data.get('order', [])
-    for item in order_list:
-        nav_item = NavigationItem.query.get(item['id'])
-        if nav_item:
-            nav_item.order = item['order']
+    NavigationItem.reorder(order_list)
     db.session.commit()
     return {"success": True}
 
@@ -1108,15 +1272,15 @@ def api_create_workshop_category():
     image_file = request.files.get('image')
     image_path = save_file(image_file, 'courses') if image_file and image_file.filename else None
     
-    # Get max order
-    max_order = db.session.query(db.func.max(WorkshopCategory.order)).scalar() or 0
+    # Next order position, computed by the INSERT itself
+    next_order = db.select(db.func.coalesce(db.func.max(WorkshopCategory.order), 0) + 1).scalar_subquery()
     
     category = WorkshopCategory(
         title=title,
         description=description,
         image_path=image_path,
         card_image_path=image_path,  # Same image for both by default
-        order=max_order + 1,
+        order=next_order,
         is_active=True,
     )
     db.session.add(category)
@@ -1129,7 +1293,7 @@ def api_create_workshop_category():
 @login_required
 def api_delete_workshop_category(category_id):
     """Delete a workshop category via AJAX."""
-    category = WorkshopCategory.query.get_or_404(category_id)
+    category = db.get_or_404(WorkshopCategory, category_id)
     db.session.delete(category)
     db.session.commit()
     return {"success": True}
@@ -1139,7 +1303,7 @@ def api_delete_workshop_category(category_id):
 @login_required
 def api_toggle_workshop_category(category_id):
     """Toggle workshop category is_active status."""
-    category = WorkshopCategory.query.get_or_404(category_id)
+    category = db.get_or_404(WorkshopCategory, category_id)
     data = request.get_json(silent=True) or {}
     is_active = data.get('is_active', True)
     category.is_active = is_active
@@ -1153,10 +1317,7 @@ def api_reorder_workshop_categories():
     """Reorder workshop categories."""
     data = request.get_json(silent=True) or {}
     order_list = data.get('order', [])
-    for item in order_list:
-        category = WorkshopCategory.query.get(item['id'])
-        if category:
-            category.order = item['order']
+    WorkshopCategory.reorder(order_list)
     db.session.commit()
     return {"success": True}
 
@@ -1165,24 +1326,17 @@ def api_reorder_workshop_categories():
 @login_required
 def update_workshop_category_content(category_id):
     """Update workshop category title/description inline."""
-    category = WorkshopCategory.query.get_or_404(category_id)
+    category = db.get_or_404(WorkshopCategory, category_id)
     data = request.get_json(silent=True) or {}
-    title = data.get('title')
-    description = data.get('description')
-
-    if title is not None:
-        category.title = title.strip()
-    if description is not None:
-        category.description = description.strip()
-    db.session.commit()
-    return {"success": True}
+    changed = _apply_inline_edit(category, data, {'title': 'title', 'description': 'description'})
+    return {"success": True, "changed": changed}
 
 
 @bp.route('/api/workshop-category/<int:category_id>/image', methods=['POST'])
 @login_required
 def update_workshop_category_image(category_id):
     """Update workshop category header image (detail page)."""
-    category = WorkshopCategory.query.get_or_404(category_id)
+    category = db.get_or_404(WorkshopCategory, category_id)
     image_file = request.files.get('image')
     saved = save_file(image_file, 'courses') if image_file else None
     if saved:
@@ -1196,7 +1350,7 @@ def update_workshop_category_image(category_id):
 @login_required
 def update_workshop_category_card_image(category_id):
     """Update workshop category card image (overview page)."""
-    category = WorkshopCategory.query.get_or_404(category_id)
+    category = db.get_or_404(WorkshopCategory, category_id)
     image_file = request.files.get('image')
     saved = save_file(image_file, 'courses') if image_file else None
     if saved:
@@ -1210,7 +1364,7 @@ def update_workshop_category_card_image(category_id):
 @login_required
 def api_create_course_in_category(category_id):
     """Create a new course within a workshop category."""
-    category = WorkshopCategory.query.get_or_404(category_id)
+    category = db.get_or_404(WorkshopCategory, category_id)
     
     title = request.form.get('title', '').strip()
     description = request.form.get('description', '').strip()
@@ -1231,14 +1385,10 @@ def api_create_course_in_category(category_id):
     parsed_date = None
     if date_str:
         try:
-            # Try date-only format first (from date input)
-            parsed_date = datetime.strptime(date_str, '%Y-%m-%d')
+            # Accepts both date and datetime-local inputs
+            parsed_date = parse_datetime(date_str)
         except ValueError:
-            try:
-                # Try datetime-local format as fallback
-                parsed_date = datetime.strptime(date_str, '%Y-%m-%dT%H:%M')
-            except ValueError:
-                pass
+            pass
     
     course = Course(
         workshop_category_id=category_id,
@@ -1257,12 +1407,7 @@ def api_create_course_in_category(category_id):
     
     # Save location mapping if both location and location_url are provided
     if location and location_url:
-        existing_mapping = LocationMapping.query.filter_by(address=location).first()
-        if existing_mapping:
-            existing_mapping.google_maps_url = location_url
-        else:
-            new_mapping = LocationMapping(address=location, google_maps_url=location_url)
-            db.session.add(new_mapping)
+        LocationMapping.upsert(location, location_url)
     
     db.session.commit()
     flash('Kurs wurde erstellt.', 'success')
@@ -1274,7 +1419,6 @@ def api_create_course_in_category(category_id):
 @login_required
 def api_get_location_mapping():
     """Get Google Maps URL for a given address."""
-    from flask import jsonify
     address = request.args.get('address', '').strip()
     if not address:
         return jsonify({'success': False, 'message': 'No address provided'})
@@ -1289,9 +1433,8 @@ def api_get_location_mapping():
 @login_required
 def api_get_all_location_mappings():
     """Get all location mappings for autocomplete."""
-    from flask import jsonify
-    mappings = LocationMapping.query.all()
-    result = {m.address: m.google_maps_url for m in mappings}
+    # Plain (address, url) rows, no ORM objects needed for the lookup table
+    result = dict(db.session.query(LocationMapping.address, LocationMapping.google_maps_url))
     return jsonify({'success': True, 'mappings': result})
 
 
@@ -1299,7 +1442,6 @@ def api_get_all_location_mappings():
 @login_required
 def api_save_location_mapping():
     """Save or update a location mapping."""
-    from flask import jsonify
     data = request.get_json()
     address = data.get('address', '').strip()
     url = data.get('url', '').strip()
@@ -1307,12 +1449,7 @@ def api_save_location_mapping():
     if not address:
         return jsonify({'success': False, 'message': 'Address required'})
     
-    existing = LocationMapping.query.filter_by(address=address).first()
-    if existing:
-        existing.google_maps_url = url
-    else:
-        new_mapping = LocationMapping(address=address, google_maps_url=url)
-        db.session.add(new_mapping)
+    LocationMapping.upsert(address, url)
     
     # Update all courses with this location to use the new URL
     courses_to_update = Course.query.filter_by(location=address).all()
@@ -1329,12 +1466,12 @@ def api_save_location_mapping():
 @login_required
 def api_sms_status():
     """Get current SMS status."""
-    setting = SiteSettings.query.filter_by(key='sms_enabled').first()
+    value = SiteSettings.get_stored_value('sms_enabled')
     # Default to True if not set (respects config setting)
-    if setting is None:
+    if value is None:
         enabled = current_app.config.get('SMS_ENABLED', False)
     else:
-        enabled = setting.value == 'true'
+        enabled = value == 'true'
     return jsonify({'enabled': enabled})
 
 
@@ -1353,5 +1490,5 @@ def api_sms_toggle():
         setting.value = 'true' if enabled else 'false'
     
     db.session.commit()
-    logger.info(f"SMS notifications {'enabled' if enabled else 'disabled'} by {current_user.email}")
+    logger.info("SMS notifications %s by %s", 'enabled' if enabled else 'disabled', current_user.email)
     return jsonify({'success': True, 'enabled': enabled})
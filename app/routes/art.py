@@ -1,22 +1,25 @@
 """Art gallery routes."""
 from flask import Blueprint, render_template
+from app import db, cache, skip_page_cache
 from app.models import ArtCategory, NavigationItem
 
 bp = Blueprint('art', __name__, url_prefix='/art')
 
 
 @bp.route('/')
+@cache.cached(unless=skip_page_cache)
 def index():
     """List all art categories."""
-    categories = ArtCategory.query.filter_by(is_active=True).order_by(ArtCategory.order).all()
-    nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
+    categories = ArtCategory.query.filter_by(is_active=True).options(db.raiseload('*')).order_by(ArtCategory.order).all()
+    nav_items = NavigationItem.get_active()
     return render_template('art/index.html', categories=categories, nav_items=nav_items)
 
 
 @bp.route('/<int:category_id>')
+@cache.cached(unless=skip_page_cache)
 def gallery(category_id):
     """Show gallery for a specific category."""
-    category = ArtCategory.query.get_or_404(category_id)
-    nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
-    images = category.images.all()
+    category = db.get_or_404(ArtCategory, category_id)
+    nav_items = NavigationItem.get_active()
+    images = category.images
     return render_template('art/gallery.html', category=category, images=images, nav_items=nav_items)
@@ -3,7 +3,7 @@ import logging
 import re
 from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import current_user
-from app import db, mail, limiter
+from app import db, mail, limiter, cache, clear_cached_page, skip_page_cache
 from app.models import Course, CourseRegistration, NavigationItem, WorkshopCategory, Page
 from flask_mail import Message
 from app.services.messaging import send_registration_messages
@@ -13,6 +13,13 @@ logger = logging.getLogger(__name__)
 
 bp = Blueprint('courses', __name__, url_prefix='/angebot')
 
+# Formatting characters removed before phone validation
+_PHONE_STRIP_RE = re.compile(r'[\s\-\.\(\)]+')
+# Digits, optionally starting with +
+_PHONE_RE = re.compile(r'^\+?\d{9,15}$')
+# Basic pattern: something@something.something
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+
 
 def validate_phone(phone: str) -> bool:
     """Validate phone number - flexible format.
@@ -21,51 +28,49 @@ def validate_phone(phone: str) -> bool:
     """
     if not phone:
         return False
-    # Remove all formatting characters
-    cleaned = re.sub(r'[\s\-\.\(\)]+', '', phone)
-    # Should be digits, optionally starting with +
-    if not re.match(r'^\+?\d{9,15}$', cleaned):
-        return False
-    return True
+    return bool(_PHONE_RE.match(_PHONE_STRIP_RE.sub('', phone)))
 
 
 def validate_email(email: str) -> bool:
     """Basic email validation."""
     if not email:
         return True  # Email is optional
-    # Basic pattern: something@something.something
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return bool(_EMAIL_RE.match(email))
 
 
 @bp.route('/')
+@cache.cached(unless=skip_page_cache)
 def index():
     """List all workshop categories."""
     # Admin sees all categories (including inactive), regular users only see active
     if current_user.is_authenticated:
-        categories = WorkshopCategory.query.order_by(WorkshopCategory.order).all()
+        categories = WorkshopCategory.query.options(db.raiseload('*')).order_by(WorkshopCategory.order).all()
     else:
-        categories = WorkshopCategory.query.filter_by(is_active=True).order_by(WorkshopCategory.order).all()
-    nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
-    # Get page title
-    page = Page.query.filter_by(slug='angebot').first()
+        categories = WorkshopCategory.query.filter_by(is_active=True).options(db.raiseload('*')).order_by(WorkshopCategory.order).all()
+    nav_items = NavigationItem.get_active()
+    # Get page title (the page content is not shown here)
+    page = Page.query.filter_by(slug='angebot').options(db.load_only(Page.id, Page.title)).first()
     return render_template('courses/index.html', categories=categories, nav_items=nav_items, page=page)
 
 
 @bp.route('/kategorie/<int:category_id>')
+@cache.cached(unless=skip_page_cache)
 def workshop_category(category_id):
     """List courses in a workshop category."""
-    category = WorkshopCategory.query.get_or_404(category_id)
-    courses = Course.query.filter_by(workshop_category_id=category_id, is_active=True).order_by(Course.date.asc()).all()
-    nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
+    category = db.get_or_404(WorkshopCategory, category_id)
+    # raiseload guards against templates lazily loading relationships per course
+    courses = Course.query.filter_by(workshop_category_id=category_id, is_active=True).options(
+        db.raiseload('*')
+    ).order_by(Course.date.asc()).all()
+    nav_items = NavigationItem.get_active()
     return render_template('courses/category.html', category=category, courses=courses, nav_items=nav_items)
 
 
 @bp.route('/<int:course_id>')
 def detail(course_id):
     """Course detail page with registration form."""
-    course = Course.query.get_or_404(course_id)
-    nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
+    course = db.get_or_404(Course, course_id)
+    nav_items = NavigationItem.get_active()
     return render_template('courses/detail.html', course=course, nav_items=nav_items)
 
 
@@ -73,13 +78,13 @@ def detail(course_id):
 @limiter.limit("10 per hour")
 def register(course_id):
     """Handle course registration."""
-    course = Course.query.get_or_404(course_id)
+    course = db.get_or_404(Course, course_id)
     
     # Honeypot check - if filled, it's a bot
     honeypot = request.form.get('website', '').strip()
     if honeypot:
         # Silently reject bot submissions - return success to not tip off the bot
-        logger.warning(f"Bot detected: honeypot field filled with '{honeypot}' for course {course_id}")
+        logger.warning("Bot detected: honeypot field filled with '%s' for course %s", honeypot, course_id)
         flash('Vielen Dank für Ihre Anmeldung!', 'success')
         return redirect(url_for('courses.detail', course_id=course_id))
     
@@ -143,6 +148,9 @@ def register(course_id):
         db.session.add(waitlist_registration)
     
     db.session.commit()
+    # The category page shows the free spots of its courses
+    if course.workshop_category_id:
+        clear_cached_page(url_for('courses.workshop_category', category_id=course.workshop_category_id))
     
     # Send notifications via messaging service
     try:
@@ -171,7 +179,7 @@ def register(course_id):
         # Notify admin
         notify_admin_registration(registration or waitlist_registration, course)
     except Exception as e:
-        logger.error(f"Error sending notifications: {e}")
+        logger.error("Error sending notifications: %s", e)
     
     # Redirect to appropriate success page
     if waitlist_count > 0 and registered_count > 0:
@@ -189,10 +197,10 @@ def register(course_id):
 @bp.route('/<int:course_id>/gemischt-erfolgreich')
 def mixed_success(course_id):
     """Show mixed registration success message (some registered, some waitlisted)."""
-    course = Course.query.get_or_404(course_id)
+    course = db.get_or_404(Course, course_id)
     registered = request.args.get('registered', 1, type=int)
     waitlist = request.args.get('waitlist', 0, type=int)
-    nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
+    nav_items = NavigationItem.get_active()
     return render_template('courses/mixed_success.html', course=course, 
                           registered=registered, waitlist=waitlist, nav_items=nav_items)
 
@@ -200,16 +208,16 @@ def mixed_success(course_id):
 @bp.route('/<int:course_id>/warteliste-erfolgreich')
 def waitlist_success(course_id):
     """Show waitlist success message."""
-    course = Course.query.get_or_404(course_id)
-    nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
+    course = db.get_or_404(Course, course_id)
+    nav_items = NavigationItem.get_active()
     return render_template('courses/waitlist_success.html', course=course, nav_items=nav_items)
 
 
 @bp.route('/<int:course_id>/anmeldung-erfolgreich')
 def registration_success(course_id):
     """Show registration success message."""
-    course = Course.query.get_or_404(course_id)
-    nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
+    course = db.get_or_404(Course, course_id)
+    nav_items = NavigationItem.get_active()
     return render_template('courses/registration_success.html', course=course, nav_items=nav_items)
 
 
@@ -1,15 +1,17 @@
 """Public routes (landing page, about/kontakt)."""
 from flask import Blueprint, render_template
+from app import cache, skip_page_cache
 from app.models import NavigationItem, Page
 
 bp = Blueprint('public', __name__)
 
 
 @bp.route('/')
+@cache.cached(unless=skip_page_cache)
 def index():
     """Landing page."""
     try:
-        nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
+        nav_items = NavigationItem.get_active()
     except:
         nav_items = []
     return render_template('public/index.html', nav_items=nav_items)
@@ -19,5 +21,5 @@ def index():
 def about_kontakt():
     """About/Kontakt page."""
     page = Page.query.filter_by(slug='about-kontakt').first()
-    nav_items = NavigationItem.query.filter_by(is_active=True).order_by(NavigationItem.order).all()
+    nav_items = NavigationItem.get_active()
     return render_template('public/about_kontakt.html', page=page, nav_items=nav_items)
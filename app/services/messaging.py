@@ -1,11 +1,14 @@
 """Messaging service for SMS and Email."""
+import contextlib
 import logging
+import urllib.parse
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
 from flask import current_app, url_for
 from flask_mail import Message
+from sqlalchemy import insert
 from app import db, mail
-from app.models import MessageTemplate, MessageLog, ScheduledMessage, CourseRegistration, Course, SiteSettings
+from app.models import MessageTemplate, MessageLog, ScheduledMessage, CourseRegistration, Course, SiteSettings, normalize_phone
 
 logger = logging.getLogger(__name__)
 
@@ -16,13 +19,9 @@ def is_sms_enabled():
     if not current_app.config.get('SMS_ENABLED'):
         return False
     
-    # Then check runtime setting from database
-    setting = SiteSettings.query.filter_by(key='sms_enabled').first()
-    if setting is not None:
-        return setting.value == 'true'
-    
-    # Default to enabled if no runtime setting exists
-    return True
+    # Then check runtime setting from database, enabled if it does not exist.
+    # Read uncached: turning SMS off has to stop paid messages in every worker at once
+    return SiteSettings.get_stored_value('sms_enabled', 'true') == 'true'
 
 
 def get_twilio_client():
@@ -45,34 +44,19 @@ def get_twilio_client():
         logger.error("Twilio package not installed. Run: pip install twilio")
         return None
     except Exception as e:
-        logger.error(f"Failed to create Twilio client: {e}")
+        logger.error("Failed to create Twilio client: %s", e)
         return None
 
 
 def format_phone_for_twilio(phone: str) -> str:
     """Format phone number for Twilio (E.164 format)."""
-    import re
-    # Remove all non-digit characters except +
-    cleaned = re.sub(r'[^\d+]', '', phone)
-    
-    # If starts with 0, assume Swiss number
-    if cleaned.startswith('0'):
-        cleaned = '+41' + cleaned[1:]
-    
-    # If no +, add it
-    if not cleaned.startswith('+'):
-        cleaned = '+' + cleaned
-    
-    return cleaned
+    # Registration numbers are already stored in this form, see CourseRegistration
+    return normalize_phone(phone)
 
 
 def get_template(message_type: str, trigger: str) -> Optional[MessageTemplate]:
     """Get message template by type and trigger."""
-    return MessageTemplate.query.filter_by(
-        message_type=message_type,
-        trigger=trigger,
-        is_active=True
-    ).first()
+    return MessageTemplate.get_active(message_type, trigger)
 
 
 def build_context(registration: CourseRegistration, **extra) -> Dict[str, Any]:
@@ -92,7 +76,6 @@ def build_context(registration: CourseRegistration, **extra) -> Dict[str, Any]:
         google_maps_link = ort_url
     elif ort:
         # Create Google Maps search URL
-        import urllib.parse
         google_maps_link = f"https://maps.google.com/?q={urllib.parse.quote(ort)}"
     else:
         google_maps_link = ''
@@ -116,20 +99,36 @@ def build_context(registration: CourseRegistration, **extra) -> Dict[str, Any]:
     return context
 
 
+def _log_message(**values):
+    """Record a sent (or failed) message with a Core INSERT and commit it.
+    
+    The commit also persists the status of the scheduled messages processed
+    before this one. A crash in a batch therefore re-sends at most the message
+    that was being sent, whose status was not committed yet, never the batch.
+    """
+    db.session.execute(insert(MessageLog), values)
+    db.session.commit()
+
+
 def send_sms(
     recipient: str,
     body: str,
     registration_id: Optional[int] = None,
     course_id: Optional[int] = None,
-    trigger: str = 'manual'
+    trigger: str = 'manual',
+    client=None
 ) -> bool:
-    """Send SMS via Twilio."""
-    client = get_twilio_client()
+    """Send SMS via Twilio.
+    
+    Pass a client from get_twilio_client() to reuse it for several messages.
+    """
+    if client is None:
+        client = get_twilio_client()
     
     if not client:
-        logger.info(f"SMS not sent (disabled): {recipient[:6]}... - {body[:50]}...")
+        logger.info("SMS not sent (disabled): %s... - %s...", recipient[:6], body[:50])
         # Log as pending/disabled
-        log = MessageLog(
+        _log_message(
             message_type='sms',
             trigger=trigger,
             recipient=recipient,
@@ -139,8 +138,6 @@ def send_sms(
             status='disabled',
             error_message='SMS not enabled'
         )
-        db.session.add(log)
-        db.session.commit()
         return False
     
     try:
@@ -154,7 +151,7 @@ def send_sms(
         )
         
         # Log success
-        log = MessageLog(
+        _log_message(
             message_type='sms',
             trigger=trigger,
             recipient=formatted_phone,
@@ -164,17 +161,15 @@ def send_sms(
             status='sent',
             external_id=message.sid
         )
-        db.session.add(log)
-        db.session.commit()
         
-        logger.info(f"SMS sent to {formatted_phone}: {message.sid}")
+        logger.info("SMS sent to %s: %s", formatted_phone, message.sid)
         return True
         
     except Exception as e:
-        logger.error(f"Failed to send SMS to {recipient}: {e}")
+        logger.error("Failed to send SMS to %s: %s", recipient, e)
         
         # Log failure
-        log = MessageLog(
+        _log_message(
             message_type='sms',
             trigger=trigger,
             recipient=recipient,
@@ -184,8 +179,6 @@ def send_sms(
             status='failed',
             error_message=str(e)
         )
-        db.session.add(log)
-        db.session.commit()
         
         return False
 
@@ -196,9 +189,13 @@ def send_email(
     body: str,
     registration_id: Optional[int] = None,
     course_id: Optional[int] = None,
-    trigger: str = 'manual'
+    trigger: str = 'manual',
+    connection=None
 ) -> bool:
-    """Send email via Flask-Mail."""
+    """Send email via Flask-Mail.
+    
+    Pass an open mail.connect() connection to reuse one SMTP session for several emails.
+    """
     try:
         msg = Message(
             subject=subject,
@@ -207,10 +204,10 @@ def send_email(
             reply_to=current_app.config.get('MAIL_REPLY_TO')
         )
         
-        mail.send(msg)
+        (connection or mail).send(msg)
         
         # Log success
-        log = MessageLog(
+        _log_message(
             message_type='email',
             trigger=trigger,
             recipient=recipient,
@@ -220,17 +217,15 @@ def send_email(
             course_id=course_id,
             status='sent'
         )
-        db.session.add(log)
-        db.session.commit()
         
-        logger.info(f"Email sent to {recipient}: {subject}")
+        logger.info("Email sent to %s: %s", recipient, subject)
         return True
         
     except Exception as e:
-        logger.error(f"Failed to send email to {recipient}: {e}")
+        logger.error("Failed to send email to %s: %s", recipient, e)
         
         # Log failure
-        log = MessageLog(
+        _log_message(
             message_type='email',
             trigger=trigger,
             recipient=recipient,
@@ -241,8 +236,6 @@ def send_email(
             status='failed',
             error_message=str(e)
         )
-        db.session.add(log)
-        db.session.commit()
         
         return False
 
@@ -271,7 +264,7 @@ def send_registration_messages(
     elif status == 'mixed':
         trigger = 'registration_mixed'
     else:
-        logger.error(f"Unknown registration status: {status}")
+        logger.error("Unknown registration status: %s", status)
         return
     
     # Build context
@@ -291,7 +284,7 @@ def send_registration_messages(
             trigger=trigger
         )
     else:
-        logger.warning(f"No SMS template found for trigger: {trigger}")
+        logger.warning("No SMS template found for trigger: %s", trigger)
     
     # Send Email (if email provided)
     if registration.email:
@@ -324,7 +317,7 @@ def send_admin_notification(registration: CourseRegistration):
     # Get template
     sms_template = get_template('sms', trigger)
     if not sms_template:
-        logger.warning(f"No SMS template found for trigger: {trigger}")
+        logger.warning("No SMS template found for trigger: %s", trigger)
         return
     
     # Build context
@@ -387,11 +380,11 @@ def schedule_reminder_sms(registration: CourseRegistration):
     course = registration.course
     
     if not course.date:
-        logger.warning(f"Cannot schedule reminder: Course {course.id} has no date")
+        logger.warning("Cannot schedule reminder: Course %s has no date", course.id)
         return
     
     if registration.is_waitlist:
-        logger.info(f"Not scheduling reminder for waitlist registration {registration.id}")
+        logger.info("Not scheduling reminder for waitlist registration %s", registration.id)
         return
     
     # Calculate time until course
@@ -405,7 +398,7 @@ def schedule_reminder_sms(registration: CourseRegistration):
     days_until_course = (course_datetime - now).days
     
     if days_until_course < 2:
-        logger.info(f"Course too soon ({days_until_course} days), not scheduling reminder")
+        logger.info("Course too soon (%s days), not scheduling reminder", days_until_course)
         return
     
     # Schedule for 1 day before at 10:00 AM
@@ -420,7 +413,7 @@ def schedule_reminder_sms(registration: CourseRegistration):
     ).first()
     
     if existing:
-        logger.info(f"Reminder already scheduled for registration {registration.id}")
+        logger.info("Reminder already scheduled for registration %s", registration.id)
         return
     
     # Create scheduled message
@@ -436,27 +429,71 @@ def schedule_reminder_sms(registration: CourseRegistration):
     db.session.add(scheduled)
     db.session.commit()
     
-    logger.info(f"Scheduled reminder for {registration.id} at {reminder_time}")
+    logger.info("Scheduled reminder for %s at %s", registration.id, reminder_time)
 
 
-def process_scheduled_messages():
-    """Process all pending scheduled messages that are due.
+def process_scheduled_messages(limit: int = 500):
+    """Process pending scheduled messages that are due.
     
     This should be called periodically (e.g., by a cron job or scheduler).
+    At most ``limit`` messages are sent per call; the rest follow on the next run.
     """
     now = datetime.utcnow()
     
-    pending = ScheduledMessage.query.filter(
-        ScheduledMessage.status == 'pending',
-        ScheduledMessage.scheduled_for <= now
-    ).all()
+    pending = ScheduledMessage.fetch_due(now, limit=limit)
+    
+    # One Twilio client and one SMTP session for the whole batch
+    sms_client = get_twilio_client() if any(s.message_type == 'sms' for s in pending) else None
+    with contextlib.ExitStack() as stack:
+        mail_connection = None
+        if any(s.message_type == 'email' for s in pending):
+            try:
+                mail_connection = _BatchMailConnection(stack.enter_context(mail.connect()))
+            except Exception as e:
+                # Each email then tries its own connection and logs the failure
+                logger.error("Failed to open mail connection: %s", e)
+        _send_scheduled_batch(pending, sms_client, mail_connection, now)
+    
+    db.session.commit()
+    
+    return len(pending)
+
+
+class _BatchMailConnection:
+    """SMTP session shared by a batch that falls back to one connection per email.
+    
+    Servers drop long sessions (message caps, idle timeouts); after the first
+    failure the email is retried on its own connection, and so are the rest.
+    """
+    
+    def __init__(self, connection):
+        self.connection = connection
+    
+    def send(self, message):
+        if self.connection is not None:
+            try:
+                self.connection.send(message)
+                return
+            except Exception as e:
+                logger.warning("Shared mail connection failed, sending the rest one by one: %s", e)
+                self.connection = None
+        mail.send(message)
+
+
+def _send_scheduled_batch(pending, sms_client, mail_connection, now):
+    """Render and send a batch of scheduled messages, updating their status."""
+    # Templates are shared by many messages in a batch, load each one once
+    templates = {}
     
     for scheduled in pending:
         # Get template
-        template = get_template(scheduled.message_type, scheduled.trigger)
+        key = (scheduled.message_type, scheduled.trigger)
+        if key not in templates:
+            templates[key] = get_template(*key)
+        template = templates[key]
         
         if not template:
-            logger.error(f"No template for scheduled message {scheduled.id}")
+            logger.error("No template for scheduled message %s", scheduled.id)
             scheduled.status = 'failed'
             scheduled.error_message = 'Template not found'
             continue
@@ -478,7 +515,8 @@ def process_scheduled_messages():
                 body=body,
                 registration_id=scheduled.registration_id,
                 course_id=scheduled.course_id,
-                trigger=scheduled.trigger
+                trigger=scheduled.trigger,
+                client=sms_client
             )
         else:
             subject = template.render_subject(**context)
@@ -488,16 +526,13 @@ def process_scheduled_messages():
                 body=body,
                 registration_id=scheduled.registration_id,
                 course_id=scheduled.course_id,
-                trigger=scheduled.trigger
+                trigger=scheduled.trigger,
+                connection=mail_connection
             )
         
         # Update status
         scheduled.status = 'sent' if success else 'failed'
         scheduled.sent_at = now
-    
-    db.session.commit()
-    
-    return len(pending)
 
 
 def cancel_scheduled_messages(registration_id: int):
@@ -621,14 +656,10 @@ Beatrice Gugger'''
         },
     ]
     
-    for tpl in templates:
-        existing = MessageTemplate.query.filter_by(
-            message_type=tpl['message_type'],
-            trigger=tpl['trigger']
-        ).first()
-        
-        if not existing:
-            template = MessageTemplate(**tpl)
-            db.session.add(template)
-    
+    existing = set(db.session.query(MessageTemplate.message_type, MessageTemplate.trigger))
+    missing = [
+        {'subject': None, **tpl} for tpl in templates
+        if (tpl['message_type'], tpl['trigger']) not in existing
+    ]
+    MessageTemplate.bulk_create(missing)
     db.session.commit()
@@ -18,16 +18,40 @@ class Config:
     # Database - ALWAYS use explicit absolute path (ignore DATABASE_URL from .env)
     SQLALCHEMY_DATABASE_URI = f'sqlite:///{DATABASE_PATH}'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Connection pool: LIFO keeps a small set of connections warm. A SQLite
+    # file connection cannot go stale, so the pre-ping SELECT on every checkout
+    # is off unless DB_POOL_PRE_PING is set (e.g. for a network database)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 20)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.environ.get('DB_POOL_PRE_PING', 'False').lower() == 'true',
+        'pool_use_lifo': True,
+    }
     
     # Flask-Login
     REMEMBER_COOKIE_DURATION = timedelta(days=7)
     
+    # Password hash method: 'argon2' (argon2id) or a Werkzeug method such as 'scrypt'.
+    # Existing hashes created with another method are upgraded on next login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'argon2')
+    # argon2id cost, default is the OWASP minimum profile (46 MiB, 1 iteration, 1 lane).
+    # Hashes with other parameters are likewise rehashed on next login.
+    ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 1))
+    ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 47104))  # KiB
+    ARGON2_PARALLELISM = int(os.environ.get('ARGON2_PARALLELISM', 1))
+    # Failed logins per account; once exceeded, attempts are rejected before hashing
+    LOGIN_FAILURE_LIMIT = os.environ.get('LOGIN_FAILURE_LIMIT', '15 per 15 minutes')
+    
     # File uploads
     MAX_CONTENT_LENGTH = int(os.environ.get('MAX_CONTENT_LENGTH', 16 * 1024 * 1024))  # 16MB
     _upload_env = os.environ.get('UPLOAD_FOLDER')
     UPLOAD_FOLDER = Path(_upload_env) if _upload_env else basedir / 'uploads'
     _allowed_env = os.environ.get('ALLOWED_EXTENSIONS')
     ALLOWED_EXTENSIONS = {ext.strip().lower() for ext in _allowed_env.split(',')} if _allowed_env else {'png', 'jpg', 'jpeg', 'gif'}
+    # Optional CDN origin-pulling from /uploads/ (e.g. https://cdn.beatricegugger.ch)
+    CDN_BASE_URL = os.environ.get('CDN_BASE_URL', '')
     
     # Email configuration
     MAIL_SERVER = os.environ.get('MAIL_SERVER', 'localhost')
@@ -54,6 +78,21 @@ class Config:
     # Email reply-to (where replies should go)
     MAIL_REPLY_TO = os.environ.get('MAIL_REPLY_TO', 'info@beatricegugger.ch')
     
+    # Rate limiting (Flask-Limiter); memory:// is per worker, use redis:// in production
+    RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI', 'memory://')
+    RATELIMIT_STRATEGY = 'fixed-window'
+    
+    # Page cache (Flask-Caching); use RedisCache with CACHE_REDIS_URL to share it between workers
+    CACHE_TYPE = os.environ.get('CACHE_TYPE', 'SimpleCache')
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 60))
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL')
+    # Seconds to keep nearly static lookups (navigation, settings, message templates)
+    QUERY_CACHE_TIMEOUT = int(os.environ.get('QUERY_CACHE_TIMEOUT', 300))
+    
+    # Compiled templates are written here and reused by other workers and
+    # after restarts (unset: every process compiles its templates itself)
+    JINJA_BYTECODE_CACHE_DIR = os.environ.get('JINJA_BYTECODE_CACHE_DIR')
+    
     # Pagination
     ITEMS_PER_PAGE = int(os.environ.get('ITEMS_PER_PAGE', 10))
     
@@ -93,7 +132,10 @@ class TestingConfig(Config):
     """Testing configuration."""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    # In-memory SQLite uses a StaticPool, which takes no pool sizing options
+    SQLALCHEMY_ENGINE_OPTIONS = {}
     WTF_CSRF_ENABLED = False
+    CACHE_TYPE = 'NullCache'
     MAIL_SUPPRESS_SEND = True
 
 
@@ -152,7 +152,9 @@ echo ""
 BACKUP_DIR="$PROJECT_ROOT/backups"
 mkdir -p "$BACKUP_DIR"
 TIMESTAMP=$(date +%Y%m%d_%H%M%S)
-cp "$PROJECT_ROOT/beatricegugger.db" "$BACKUP_DIR/beatricegugger_predeploy_$TIMESTAMP.db"
+# Use SQLite's online backup: in WAL mode recent commits may still be in beatricegugger.db-wal
+python3 -c "import sqlite3, sys; sqlite3.connect(sys.argv[1]).backup(sqlite3.connect(sys.argv[2]))" \
+    "$PROJECT_ROOT/beatricegugger.db" "$BACKUP_DIR/beatricegugger_predeploy_$TIMESTAMP.db"
 echo -e "${GREEN}✓${NC} Database backup created: beatricegugger_predeploy_$TIMESTAMP.db"
 
 # Build and deploy with Docker Compose
@@ -200,7 +202,7 @@ if [ -d "/etc/apache2" ]; then
         fi
         
         # Enable required modules
-        sudo a2enmod proxy proxy_http headers rewrite ssl > /dev/null 2>&1
+        sudo a2enmod proxy proxy_http headers rewrite ssl deflate brotli > /dev/null 2>&1
         echo -e "${GREEN}✓${NC} Apache modules enabled"
         
         # Create challenge directory
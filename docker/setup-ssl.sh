@@ -37,7 +37,7 @@ fi
 echo -e "${GREEN}✓${NC} Certbot installed"
 
 # Check Apache modules
-a2enmod proxy proxy_http headers rewrite ssl > /dev/null 2>&1
+a2enmod proxy proxy_http headers rewrite ssl deflate brotli > /dev/null 2>&1
 echo -e "${GREEN}✓${NC} Apache modules enabled"
 
 # Create challenge directory
@@ -5,7 +5,7 @@ from datetime import datetime
 
 def init_db():
     """Initialize database with default data."""
-    app = create_app()
+    app = create_app(register_web=False)
     
     with app.app_context():
         # Create all tables
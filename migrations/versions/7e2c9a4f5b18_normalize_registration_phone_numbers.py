@@ -0,0 +1,60 @@
+"""Normalize registration phone numbers to E.164
+
+Revision ID: 7e2c9a4f5b18
+Revises: d4a8f26b9e13
+Create Date: 2026-10-15 14:41:06.228517
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e2c9a4f5b18'
+down_revision = 'd4a8f26b9e13'
+branch_labels = None
+depends_on = None
+
+
+def _normalize_phone(phone):
+    # Same rules as app.models.normalize_phone at the time of this migration
+    cleaned = re.sub(r'\(0\)|[^\d+]', '', phone)
+    digits = cleaned.lstrip('+')
+    if not digits.isdigit():
+        raise ValueError(f'Not a phone number: {phone!r}')
+    if cleaned.startswith('+'):
+        return '+' + digits
+    if cleaned.startswith('00'):
+        return '+' + cleaned[2:]
+    if cleaned.startswith('0'):
+        return '+41' + cleaned[1:]
+    # Swiss national number typed without the leading zero (79 123 45 67)
+    if len(cleaned) == 9:
+        return '+41' + cleaned
+    return '+' + cleaned
+
+
+def upgrade():
+    conn = op.get_bind()
+    queries = (
+        ('course_registrations', 'telefonnummer', 'SELECT id, telefonnummer FROM course_registrations'),
+        ('scheduled_messages', 'recipient', "SELECT id, recipient FROM scheduled_messages WHERE message_type = 'sms'"),
+    )
+    for table, column, query in queries:
+        for row_id, phone in conn.execute(sa.text(query)).fetchall():
+            try:
+                normalized = _normalize_phone(phone) if phone else phone
+            except ValueError:
+                continue  # no digits at all, left for an admin to correct
+            if normalized != phone:
+                conn.execute(
+                    sa.text(f'UPDATE {table} SET {column} = :phone WHERE id = :id'),
+                    {'phone': normalized, 'id': row_id},
+                )
+
+
+def downgrade():
+    # The original formatting is not kept; normalized numbers stay valid
+    pass
@@ -0,0 +1,39 @@
+"""Lowercase user emails
+
+Revision ID: a31f6c0d8e57
+Revises: 7e2c9a4f5b18
+Create Date: 2026-10-15 15:08:33.672140
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a31f6c0d8e57'
+down_revision = '7e2c9a4f5b18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Accounts whose addresses differ only by case or spaces would collide on
+    # the unique index; stop before changing anything and let an admin decide
+    duplicates = op.get_bind().execute(sa.text(
+        'SELECT LOWER(TRIM(email)), COUNT(*) FROM users '
+        'GROUP BY LOWER(TRIM(email)) HAVING COUNT(*) > 1'
+    )).all()
+    if duplicates:
+        listed = ', '.join(f'{email} ({count}x)' for email, count in duplicates)
+        raise RuntimeError(
+            f'Cannot lowercase user emails, these addresses exist more than once '
+            f'when case is ignored: {listed}. Delete or rename the extra accounts and run the upgrade again.'
+        )
+
+    # Logins look up the lowercased address through the unique email index
+    op.execute('UPDATE users SET email = LOWER(TRIM(email))')
+
+
+def downgrade():
+    # The original capitalization is not kept; lowercase addresses stay valid
+    pass
@@ -0,0 +1,64 @@
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+import click
+
+from app import create_app, db
+from config import TestingConfig
+
+
+def test_import_does_not_load_optional_extensions():
+    code = (
+        "import sys, app; "
+        "assert 'flask_mail' not in sys.modules; "
+        "assert 'flask_migrate' not in sys.modules; "
+        "app.create_app('testing'); "
+        "assert 'flask_migrate' not in sys.modules"
+    )
+    result = subprocess.run(
+        [sys.executable, '-c', code],
+        cwd=Path(__file__).resolve().parent.parent,
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_apps_share_engine_for_same_database():
+    first = create_app('testing', register_web=False)
+    second = create_app('testing', register_web=False)
+    with first.app_context():
+        engine = db.engine
+    with second.app_context():
+        assert db.engine is engine
+
+
+def test_sqlite_connections_use_pragmas(app):
+    with db.engine.connect() as conn:
+        assert conn.exec_driver_sql('PRAGMA synchronous').scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql('PRAGMA busy_timeout').scalar() == 10000
+
+
+def test_json_matches_default_provider(app):
+    payload = {'b': 'Plätze', 'a': [1, None], 'when': datetime(2024, 5, 1, 12, 30), 3: True}
+    with app.test_request_context():
+        response = app.json.response(payload)
+        assert app.json.loads(response.get_data()) == {
+            'a': [1, None], 'b': 'Plätze', 'when': 'Wed, 01 May 2024 12:30:00 GMT', '3': True}
+        assert response.get_data(as_text=True).startswith('{"3":true,"a"')
+
+
+def test_templates_compiled_to_bytecode_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(TestingConfig, 'JINJA_BYTECODE_CACHE_DIR', str(tmp_path / 'jinja'), raising=False)
+    app = create_app('testing')
+    with app.app_context():
+        app.jinja_env.get_template('errors/404.html')
+    assert list((tmp_path / 'jinja').iterdir())
+
+
+def test_flask_cli_gets_db_commands():
+    with click.Context(click.Command('flask')):
+        app = create_app('testing', register_web=False)
+    assert 'db' in app.cli.commands
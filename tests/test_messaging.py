@@ -0,0 +1,81 @@
+import contextlib
+import smtplib
+from datetime import datetime, timedelta
+
+from app import cache, db, mail
+from app.models import Course, CourseRegistration, MessageLog, ScheduledMessage, SiteSettings
+from app.services.messaging import init_default_templates, is_sms_enabled, process_scheduled_messages
+
+
+def test_process_scheduled_messages_sends_due_batch(app):
+    app.config['MAIL_SUPPRESS_SEND'] = True
+    init_default_templates()
+    course = Course(title='Kurs', date=datetime.utcnow() + timedelta(days=1))
+    db.session.add(course)
+    db.session.commit()
+    registration = CourseRegistration(course_id=course.id, vorname='Max', name='Muster',
+                                      telefonnummer='0791234567', email='max@example.ch')
+    db.session.add(registration)
+    db.session.commit()
+    for minutes in (-5, -1, 60):
+        db.session.add(ScheduledMessage(
+            message_type='email', trigger='registration_confirmed', recipient='max@example.ch',
+            registration_id=registration.id, course_id=course.id,
+            scheduled_for=datetime.utcnow() + timedelta(minutes=minutes),
+        ))
+    db.session.commit()
+
+    with mail.record_messages() as outbox:
+        assert process_scheduled_messages() == 2
+
+    assert len(outbox) == 2
+    assert [m.status for m in ScheduledMessage.query.order_by(ScheduledMessage.scheduled_for)] == ['sent', 'sent', 'pending']
+    assert MessageLog.query.filter_by(status='sent').count() == 2
+
+
+def test_sms_switch_not_served_from_cache(app):
+    app.config['SMS_ENABLED'] = True
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    assert SiteSettings.get_value('sms_enabled', 'true') == 'true'  # now cached
+    # Written by another worker: this worker's cache is not cleared
+    db.session.execute(SiteSettings.__table__.insert().values(key='sms_enabled', value='false'))
+    assert not is_sms_enabled()
+
+
+def test_scheduled_emails_survive_dropped_mail_connection(app, monkeypatch):
+    app.config['MAIL_SUPPRESS_SEND'] = True
+    init_default_templates()
+    course = Course(title='Kurs', date=datetime.utcnow() + timedelta(days=1))
+    db.session.add(course)
+    db.session.commit()
+    registration = CourseRegistration(course_id=course.id, vorname='Max', name='Muster',
+                                      telefonnummer='0791234567', email='max@example.ch')
+    db.session.add(registration)
+    db.session.commit()
+    for minutes in (-3, -2, -1):
+        db.session.add(ScheduledMessage(
+            message_type='email', trigger='registration_confirmed', recipient='max@example.ch',
+            registration_id=registration.id, course_id=course.id,
+            scheduled_for=datetime.utcnow() + timedelta(minutes=minutes),
+        ))
+    db.session.commit()
+
+    class DroppingConnection:
+        """Accepts one email, then behaves like a session the server closed."""
+        sent = 0
+
+        def send(self, message):
+            if self.sent:
+                raise smtplib.SMTPServerDisconnected('Connection unexpectedly closed')
+            self.sent += 1
+
+    connection = DroppingConnection()
+    connections = iter([contextlib.nullcontext(connection)])
+    real_connect = mail.connect
+    monkeypatch.setattr(mail, 'connect', lambda: next(connections, None) or real_connect())
+    with mail.record_messages() as outbox:
+        assert process_scheduled_messages() == 3
+
+    assert connection.sent == 1
+    assert len(outbox) == 2  # the rest went over their own connections
+    assert {m.status for m in ScheduledMessage.query} == {'sent'}
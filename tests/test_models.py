@@ -0,0 +1,197 @@
+import pytest
+from werkzeug.security import generate_password_hash
+
+from app import cache, db
+from app.models import Course, CourseRegistration, LocationMapping, MessageTemplate, NavigationItem, SiteSettings, User, _dummy_password_hash, normalize_phone
+
+
+def _register(course, num_participants, is_waitlist=False):
+    db.session.add(CourseRegistration(
+        course_id=course.id,
+        vorname='Max',
+        name='Muster',
+        telefonnummer='0791234567',
+        num_participants=num_participants,
+        is_waitlist=is_waitlist,
+    ))
+
+
+def test_registration_count_excludes_waitlist(app):
+    course = Course(title='Kurs', max_participants=3)
+    db.session.add(course)
+    db.session.commit()
+    _register(course, 2)
+    _register(course, 4, is_waitlist=True)
+    db.session.commit()
+
+    assert course.registration_count == 2
+    assert course.spots_available == 1
+    assert not course.is_full
+
+
+def test_registration_count_refreshes_after_commit(app):
+    course = Course(title='Kurs', max_participants=2)
+    db.session.add(course)
+    db.session.commit()
+    assert course.registration_count == 0
+
+    _register(course, 2)
+    db.session.commit()
+    assert course.registration_count == 2
+    assert course.is_full
+
+
+def test_registration_counts_stored_on_course(app):
+    first = Course(title='Eins')
+    second = Course(title='Zwei')
+    db.session.add_all([first, second])
+    db.session.commit()
+    _register(first, 3)
+    _register(first, 1, is_waitlist=True)
+    db.session.commit()
+
+    db.session.expunge_all()
+    courses = Course.query.order_by(Course.id).all()
+    assert all('participant_count' in c.__dict__ for c in courses)
+    assert [(c.registration_count, c.waitlist_count) for c in courses] == [(3, 1), (0, 0)]
+
+
+def test_registration_counts_follow_updates_and_deletes(app):
+    course = Course(title='Kurs')
+    db.session.add(course)
+    db.session.commit()
+    _register(course, 2, is_waitlist=True)
+    db.session.commit()
+    registration = CourseRegistration.query.one()
+
+    registration.is_waitlist = False
+    db.session.commit()
+    assert (course.participant_count, course.waitlist_count) == (2, 0)
+
+    db.session.delete(registration)
+    db.session.commit()
+    assert (course.participant_count, course.waitlist_count) == (0, 0)
+
+
+def test_password_needs_rehash_for_legacy_method(app):
+    user = User(email='a@b.ch', name='A', password_hash=generate_password_hash('secret1', method='pbkdf2:sha256'))
+    assert user.check_password('secret1')
+    assert user.password_needs_rehash()
+
+    user.set_password('secret1')
+    assert user.check_password('secret1')
+    assert not user.password_needs_rehash()
+
+
+def test_bulk_create_registrations(app):
+    course = Course(title='Kurs', max_participants=5)
+    db.session.add(course)
+    db.session.commit()
+    CourseRegistration.bulk_create([
+        {'course_id': course.id, 'vorname': 'Max', 'name': 'Muster', 'telefonnummer': '0791234567', 'num_participants': n}
+        for n in (1, 2)
+    ])
+    db.session.commit()
+
+    assert course.registration_count == 3
+    assert CourseRegistration.query.filter_by(is_waitlist=True).count() == 0
+
+
+def test_message_template_render(app):
+    template = MessageTemplate(message_type='email', trigger='t', subject='Kurs {kurstitel}',
+                               body='Hallo {vorname}, {kurstitel} am {datum}. {unbekannt} {x')
+    assert template.render(vorname='Anna', kurstitel='Malen', datum=None) == 'Hallo Anna, Malen am . {unbekannt} {x'
+    assert template.render_subject(kurstitel='Malen') == 'Kurs Malen'
+
+
+def test_registration_count_expires_on_flush(app):
+    course = Course(title='Kurs', max_participants=2)
+    db.session.add(course)
+    db.session.commit()
+    assert course.registration_count == 0
+
+    _register(course, 2)
+    db.session.flush()
+    assert course.registration_count == 2
+    assert course.is_full
+
+
+def test_password_hash_uses_argon2id(app):
+    user = User(email='a@b.ch', name='A', password_hash=generate_password_hash('secret1', method='scrypt'))
+    assert user.check_password('secret1')
+    assert user.password_needs_rehash()
+
+    user.set_password('secret1')
+    assert user.password_hash.startswith('$argon2id$')
+    assert user.check_password('secret1')
+    assert not user.check_password('wrong')
+    assert not user.password_needs_rehash()
+
+
+def test_query_cache_cleared_after_commit(app):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    assert [item['slug'] for item in NavigationItem.get_active()] == ['about-kontakt']
+
+    db.session.add(NavigationItem(title='Kunst', slug='art', order=1))
+    assert len(NavigationItem.get_active()) == 1  # served from cache
+    db.session.commit()
+    assert [item['slug'] for item in NavigationItem.get_active()] == ['about-kontakt', 'art']
+
+    kunst = NavigationItem.query.filter_by(slug='art').one()
+    NavigationItem.reorder([{'id': kunst.id, 'order': -1}])
+    db.session.commit()
+    assert [item['slug'] for item in NavigationItem.get_active()] == ['art', 'about-kontakt']
+
+    assert SiteSettings.get_value('sms_enabled', 'true') == 'true'
+    db.session.add(SiteSettings(key='sms_enabled', value='false'))
+    db.session.commit()
+    assert SiteSettings.get_value('sms_enabled', 'true') == 'false'
+
+
+def test_registration_phone_stored_in_e164(app):
+    for raw in ('079 123 45 67', '+41 (0)79 123 45 67', '0041 79 123 45 67', '+41791234567', '79 123 45 67'):
+        assert normalize_phone(raw) == '+41791234567'
+    assert normalize_phone('+49 170 1234567') == '+491701234567'
+    for raw in ('', '+', '-'):
+        with pytest.raises(ValueError):
+            normalize_phone(raw)
+    course = Course(title='Kurs')
+    db.session.add(course)
+    db.session.commit()
+    _register(course, 1)
+    db.session.commit()
+    assert CourseRegistration.query.one().telefonnummer == '+41791234567'
+
+
+def test_check_password_without_user_always_fails(app):
+    assert User.check_password_without_user('secret1') is False
+    assert User.check_password_without_user('') is False
+
+
+def test_check_password_without_user_uses_configured_method(app):
+    app.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    assert User.check_password_without_user('secret1') is False
+    assert _dummy_password_hash('pbkdf2:sha256:1000').startswith('pbkdf2:sha256:1000$')
+
+
+def test_password_rehashed_when_argon2_cost_changes(app):
+    user = User(email='a@b.ch', name='A')
+    user.set_password('secret1')
+    assert not user.password_needs_rehash()
+
+    app.config['ARGON2_MEMORY_COST'] = 19456
+    assert user.check_password('secret1')
+    assert user.password_needs_rehash()
+    user.set_password('secret1')
+    assert 'm=19456' in user.password_hash
+    assert not user.password_needs_rehash()
+
+
+def test_location_mapping_upsert(app):
+    LocationMapping.upsert('Atelier', 'https://maps.example/1')
+    LocationMapping.upsert('Atelier', 'https://maps.example/2')
+    LocationMapping.upsert('Park', 'https://maps.example/3')
+    db.session.commit()
+    assert dict(db.session.query(LocationMapping.address, LocationMapping.google_maps_url)) == {
+        'Atelier': 'https://maps.example/2', 'Park': 'https://maps.example/3',
+    }
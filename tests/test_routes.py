@@ -1,4 +1,18 @@
-from app.models import CourseRegistration
+import io
+import os
+import tempfile
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+from werkzeug.datastructures import FileStorage
+
+from app import _ensure_upload_dirs, cache, db
+from app.models import ArtCategory, ArtImage, Course, CourseRegistration, MessageLog, Page, User, WorkshopCategory
+from app.routes.admin import (
+    _begin_write_transaction, _fast_copy, _notification_pool, _store_upload, parse_datetime, save_file, validate_email,
+)
+from app.services.messaging import init_default_templates
 
 
 def test_public_index(client):
@@ -32,3 +46,335 @@ def test_course_registration_flow(client, course):
     assert resp.status_code == 200
     with client.application.app_context():
         assert CourseRegistration.query.count() == 1
+
+
+def test_health_check(client):
+    resp = client.get('/health')
+    assert resp.status_code == 200
+    assert resp.get_json()['database'] == 'connected'
+
+
+def test_admin_login_ignores_email_case(client):
+    user = User(email='Admin@Example.ch', name='Admin')
+    user.set_password('secret1')
+    db.session.add(user)
+    db.session.commit()
+    assert user.email == 'admin@example.ch'
+
+    resp = client.post('/admin/login', data={'email': ' ADMIN@example.ch', 'password': 'secret1'})
+    assert resp.status_code == 302
+
+
+def test_admin_login_failures_limited_per_email(app, client):
+    app.config['LOGIN_FAILURE_LIMIT'] = '2 per minute'
+    user = User(email='admin@example.ch', name='Admin')
+    user.set_password('secret1')
+    db.session.add(user)
+    db.session.commit()
+
+    for _ in range(2):
+        resp = client.post('/admin/login', data={'email': 'admin@example.ch', 'password': 'wrong'})
+        assert resp.status_code == 200
+    resp = client.post('/admin/login', data={'email': 'Admin@example.ch', 'password': 'secret1'})
+    assert resp.status_code == 429
+    resp = client.post('/admin/login', data={'email': 'other@example.ch', 'password': 'wrong'})
+    assert resp.status_code == 200
+
+
+def _login_admin(client):
+    user = User(email='admin@example.ch', name='Admin')
+    user.set_password('secret1')
+    db.session.add(user)
+    db.session.commit()
+    client.post('/admin/login', data={'email': 'admin@example.ch', 'password': 'secret1'})
+
+
+def test_admin_upload_saved_to_upload_folder(app, client, tmp_path):
+    app.upload_folder_abs = str(tmp_path)
+    _ensure_upload_dirs(app.upload_folder_abs)
+    _login_admin(client)
+    page_id = Page.query.first().id
+
+    data = b'GIF89a' + os.urandom(600 * 1024)
+    resp = client.post(f'/admin/api/page/{page_id}/image',
+                       data={'image': (io.BytesIO(data), 'bild.gif')})
+    path = tmp_path / resp.get_json()['image_path']
+    assert path.read_bytes() == data
+    assert path.stat().st_mode & 0o777 == 0o644
+    assert list((tmp_path / '.tmp').iterdir()) == []
+
+
+def test_fast_copy_from_file_and_memory(tmp_path):
+    data = os.urandom(3 * 1024 * 1024)
+    with tempfile.TemporaryFile('wb+') as spooled:
+        spooled.write(data)
+        _fast_copy(spooled, tmp_path / 'from_file')
+    _fast_copy(io.BytesIO(data), tmp_path / 'from_memory')
+    assert (tmp_path / 'from_file').read_bytes() == data
+    assert (tmp_path / 'from_memory').read_bytes() == data
+
+
+def test_art_images_uploaded_in_order(app, client, tmp_path):
+    app.upload_folder_abs = str(tmp_path)
+    _ensure_upload_dirs(app.upload_folder_abs)
+    _login_admin(client)
+    category = ArtCategory(title='Bilder')
+    db.session.add(category)
+    db.session.commit()
+    db.session.add(ArtImage(category_id=category.id, image_path='art/alt.gif', order=4))
+    db.session.commit()
+
+    files = [(io.BytesIO(b'GIF89a'), name) for name in ('a.gif', 'b.gif')]
+    client.post(f'/admin/api/art-category/{category.id}/images', data={'images': files, 'caption': 'Neu'})
+    images = ArtImage.query.filter_by(category_id=category.id).order_by(ArtImage.order).all()
+    assert [(i.order, i.caption) for i in images] == [(4, None), (5, 'Neu'), (6, 'Neu')]
+    assert images[2].image_path.endswith('_b.gif')
+
+
+def test_begin_write_transaction_takes_lock(app):
+    _begin_write_transaction()
+    assert db.session.connection().connection.driver_connection.in_transaction
+    _begin_write_transaction()  # no-op inside a transaction
+    db.session.rollback()
+
+
+def test_admin_login_does_not_take_write_lock(app, client):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        client.post('/admin/login', data={'email': 'nobody@example.ch', 'password': 'x'})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    assert 'BEGIN IMMEDIATE' not in statements
+
+
+def test_store_upload_without_temp_file_replaces_atomically(tmp_path):
+    _store_upload(io.BytesIO(b'GIF89a'), tmp_path / 'bild.gif')
+    assert [p.name for p in tmp_path.iterdir()] == ['bild.gif']
+    assert (tmp_path / 'bild.gif').read_bytes() == b'GIF89a'
+
+
+def test_parse_datetime_accepts_form_inputs():
+    assert parse_datetime('2024-05-01T18:30') == datetime(2024, 5, 1, 18, 30)
+    assert parse_datetime('2024-05-01') == datetime(2024, 5, 1)
+    for value in ('01.05.2024', '2024-05-01T18:30+02:00'):
+        with pytest.raises(ValueError):
+            parse_datetime(value)
+
+
+def test_workshop_categories_appended_in_order(client):
+    _login_admin(client)
+    for title in ('Malen', 'Zeichnen'):
+        client.post('/admin/api/workshop-category', data={'title': title})
+    categories = WorkshopCategory.query.order_by(WorkshopCategory.order).all()
+    assert [(c.title, c.order) for c in categories] == [('Malen', 1), ('Zeichnen', 2)]
+
+
+def test_admin_course_list_paginated(app, client):
+    app.config['ITEMS_PER_PAGE'] = 1
+    _login_admin(client)
+    db.session.add_all([Course(title='Aelterer Kurs'), Course(title='Neuerer Kurs')])
+    db.session.commit()
+    Course.query.filter_by(title='Aelterer Kurs').update({'created_at': datetime(2020, 1, 1)})
+    db.session.commit()
+
+    first = client.get('/admin/courses')
+    assert b'Neuerer Kurs' in first.data and b'Aelterer Kurs' not in first.data
+    assert b'Seite 1 von 2' in first.data
+    second = client.get('/admin/courses?page=2')
+    assert b'Aelterer Kurs' in second.data
+
+
+def test_admin_art_list_counts_images(client):
+    _login_admin(client)
+    category = ArtCategory(title='Bilder')
+    db.session.add(category)
+    db.session.commit()
+    ArtImage.bulk_create([{'category_id': category.id, 'image_path': f'art/{n}.gif', 'order': n} for n in range(3)])
+    db.session.commit()
+    db.session.expunge_all()
+
+    resp = client.get('/admin/art')
+    assert b'<td>3</td>' in resp.data
+
+
+def test_repeated_login_keeps_recent_last_login(client):
+    _login_admin(client)
+    user = User.query.one()
+    first_login = user.last_login
+    assert first_login is not None
+
+    client.get('/admin/logout')
+    client.post('/admin/login', data={'email': 'admin@example.ch', 'password': 'secret1'})
+    db.session.refresh(user)
+    assert user.last_login == first_login
+
+
+def test_admin_pages_revalidate_with_etag(client):
+    _login_admin(client)
+    resp = client.get('/admin/pages')
+    assert resp.status_code == 200 and resp.headers['ETag']
+    assert 'private' in resp.headers['Cache-Control']
+
+    cached = client.get('/admin/pages', headers={'If-None-Match': resp.headers['ETag']})
+    assert cached.status_code == 304 and cached.data == b''
+
+
+def _count_queries(client, url):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    db.session.expire_all()
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        assert client.get(url).status_code == 200
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+    return len(statements)
+
+
+def test_list_pages_query_count_independent_of_rows(client):
+    _login_admin(client)
+    category = WorkshopCategory(title='Malen', is_active=True)
+    db.session.add(category)
+    db.session.commit()
+    category_id = category.id
+
+    def add_rows(count):
+        for _ in range(count):
+            course = Course(title='Kurs', is_active=True, workshop_category_id=category_id, date=datetime(2030, 1, 1))
+            art_category = ArtCategory(title='Bilder', is_active=True)
+            db.session.add_all([course, art_category])
+            db.session.flush()
+            db.session.add(CourseRegistration(course_id=course.id, vorname='Max', name='Muster',
+                                              telefonnummer='0791234567', num_participants=1))
+            db.session.add(ArtImage(category_id=art_category.id, image_path='art/bild.gif'))
+        db.session.commit()
+
+    # A lazy load per row in any of these templates shows up as extra queries
+    urls = ['/angebot/', f'/angebot/kategorie/{category_id}', '/art/', '/admin/courses',
+            '/admin/art', '/admin/pages', '/admin/navigation', '/admin/admin_users']
+    add_rows(1)
+    before = {url: _count_queries(client, url) for url in urls}
+    add_rows(3)
+    assert {url: _count_queries(client, url) for url in urls} == before
+
+
+def test_admin_validate_email():
+    for email in ('', 'a@b.ch', 'anna.muster+kurs@mail.example.ch', 'a@.b.c'):
+        assert validate_email(email)
+    for email in ('a', '@b.ch', 'a@b', 'a@.ch', 'a@ch.', 'a@b@c.ch', 'a b@c.ch', 'a@b.ch\n'):
+        assert not validate_email(email)
+
+
+def test_reorder_art_categories(client):
+    _login_admin(client)
+    first = ArtCategory(title='Eins', order=0)
+    second = ArtCategory(title='Zwei', order=1)
+    db.session.add_all([first, second])
+    db.session.commit()
+
+    response = client.post('/admin/api/art-categories/reorder', json={'order': [
+        {'id': first.id, 'order': 1}, {'id': second.id, 'order': 0}, {'id': 999, 'order': 2},
+    ]})
+    assert response.get_json() == {'success': True}
+    assert [c.title for c in ArtCategory.query.order_by(ArtCategory.order)] == ['Zwei', 'Eins']
+
+
+def test_save_file_rejects_unknown_subfolder(app):
+    with pytest.raises(ValueError):
+        save_file(FileStorage(io.BytesIO(b'GIF89a'), 'bild.gif'), '../static')
+
+
+def test_update_user_email_must_be_unique(client):
+    _login_admin(client)
+    other = User(email='zweite@example.ch', name='Zweite')
+    other.set_password('secret1')
+    db.session.add(other)
+    db.session.commit()
+    admin_id = User.query.filter_by(email='admin@example.ch').one().id
+
+    response = client.put(f'/admin/api/user/{admin_id}', json={'name': 'Admin', 'email': 'Zweite@example.ch'})
+    assert response.status_code == 400
+    response = client.put(f'/admin/api/user/{admin_id}', json={'name': 'Admin', 'email': 'admin@example.ch'})
+    assert response.get_json()['success']
+
+
+def test_promotion_message_sent_in_background(client):
+    _login_admin(client)
+    init_default_templates()
+    course = Course(title='Kurs', max_participants=2)
+    db.session.add(course)
+    db.session.commit()
+    registration = CourseRegistration(course_id=course.id, vorname='Max', name='Muster',
+                                      telefonnummer='0791234567', num_participants=3, is_waitlist=True)
+    db.session.add(registration)
+    db.session.commit()
+
+    response = client.post(f'/admin/api/registration/{registration.id}/promote')
+    assert response.get_json()['success']
+    _notification_pool.submit(lambda: None).result()  # single worker: waits for the send
+    db.session.expire_all()
+    promoted = CourseRegistration.query.filter_by(is_waitlist=False).one()
+    assert promoted.num_participants == 2
+    assert [(log.registration_id, log.trigger) for log in MessageLog.query] == [(promoted.id, 'promoted_from_waitlist')]
+
+
+def test_unchanged_inline_edit_skips_commit(client):
+    _login_admin(client)
+    page = Page.query.first()
+    url = f'/admin/api/page/{page.id}/content'
+
+    assert client.post(url, json={'content': ' Hello world ', 'title': 'About'}).get_json() == {'success': True, 'changed': False}
+    assert client.post(url, json={'title': 'Über mich '}).get_json() == {'success': True, 'changed': True}
+    db.session.expire_all()
+    assert (page.title, page.content) == ('Über mich', 'Hello world')
+
+
+def test_page_cache_cleared_only_by_admin_writes(app, client):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    cache.set('view//art/', 'cached')
+    client.post('/admin/login', data={'email': 'nobody@example.ch', 'password': 'x'})
+    _login_admin(client)
+    assert cache.get('view//art/') == 'cached'
+
+    client.post(f'/admin/api/page/{Page.query.first().id}/content', json={'title': 'Neu'})
+    assert cache.get('view//art/') is None
+
+
+def test_registration_clears_only_its_category_page(app, client):
+    cache.init_app(app, config={'CACHE_TYPE': 'SimpleCache'})
+    category = WorkshopCategory(title='Malen', is_active=True)
+    db.session.add(category)
+    db.session.commit()
+    course = Course(title='Kurs', is_active=True, workshop_category_id=category.id, max_participants=5)
+    db.session.add(course)
+    db.session.commit()
+    category_page, other_page = f'view//angebot/kategorie/{category.id}', 'view//angebot/'
+    cache.set(category_page, 'cached')
+    cache.set(other_page, 'cached')
+
+    response = client.post(f'/angebot/{course.id}/register', data={
+        'vorname': 'Max', 'name': 'Muster', 'telefonnummer': '079 123 45 67', 'num_participants': '1',
+    })
+    assert response.status_code == 302
+    assert cache.get(category_page) is None
+    assert cache.get(other_page) == 'cached'
+
+
+def test_uploads_in_progress_not_served(app, client, tmp_path):
+    app.upload_folder_abs = str(tmp_path)
+    _ensure_upload_dirs(app.upload_folder_abs)
+    (tmp_path / '.tmp' / 'spool').write_bytes(b'GIF89a')
+    (tmp_path / 'art' / '.abc.part').write_bytes(b'GIF89a')
+    (tmp_path / 'art' / 'bild.gif').write_bytes(b'GIF89a')
+
+    assert client.get('/uploads/.tmp/spool').status_code == 404
+    assert client.get('/uploads/art/.abc.part').status_code == 404
+    assert client.get('/uploads/art/bild.gif').status_code == 200